@@ -1,6 +1,10 @@
 import logging
 import os
 import shutil
+import tempfile
+import time
+import uuid
+from pathlib import Path
 from typing import List
 
 from flask import Flask, render_template, jsonify, request, send_file, session
@@ -8,7 +12,9 @@ from flask import Flask, render_template, jsonify, request, send_file, session
 from src import utils
 from src.algorithms.csp import CSP, Status
 from src.controller.controller import Controller
+from src.collector.catalogue_service import CatalogueService
 from src.collector.db import Database
+from src.convertor.convertor import Convertor
 from src.data.degree import Degree
 from src.data.course import Course
 from src.data.language import Language
@@ -26,19 +32,73 @@ app = Flask(
 )
 app.secret_key = os.urandom(24)
 db = Database()
+if db.are_shared_tables_exists():
+    db.check_shared_schema_version()
+db.use_shared_snapshot()
+db.use_catalogue()
+# Shared by all the requests, the courses of every campus, language and degrees are loaded once.
+catalogue = CatalogueService(db)
 utils.config_logging_level(logging.DEBUG)
+if os.environ.get("profile_queries", "false").lower() == "true":
+    Database.query_profiler.enable()
+# The results of a session are removed when a later request sees they are older than this.
+SESSION_RESULTS_MAX_AGE_SECONDS = 60 * 60
 
 
-@app.route("/")
-def index():
+@app.before_request
+def start_queries_profiling():
+    if Database.query_profiler.enabled:
+        Database.query_profiler.start_scope()
+
+
+@app.after_request
+def log_queries_profiling(response):
+    if Database.query_profiler.enabled:
+        Database.query_profiler.log_summary(f"Request {request.path} queries", Database.query_profiler.end_scope())
+    return response
+
+
+def remove_old_sessions_results(sessions_path: Path, max_age_seconds: int = SESSION_RESULTS_MAX_AGE_SECONDS):
+    """
+    Remove the results of the sessions that weren't changed in the last max_age_seconds.
+    """
+    if not sessions_path.exists():
+        return
+    now = time.time()
+    for session_path in sessions_path.iterdir():
+        try:
+            if now - session_path.stat().st_mtime > max_age_seconds:
+                shutil.rmtree(session_path, ignore_errors=True)
+        except FileNotFoundError:
+            # Removed by another request
+            continue
+
+
+def get_session_id() -> str:
+    if "id" not in session:
+        session["id"] = uuid.uuid4().hex
+    return session["id"]
+
+
+def create_settings() -> Settings:
     language = Language.HEBREW
-    Language.set_current(language)
     settings = Settings()
     settings.language = language
     settings.year = utils.convert_year(settings.year, language)
-    degrees: List[Degree] = db.load_degrees()
+    return settings
+
+
+def load_settings() -> Settings:
+    # The settings are kept in memory per session, nothing is written to the shared settings file.
+    return db.load_settings(get_session_id()) or create_settings()
+
+
+@app.route("/")
+def index():
+    Language.set_current(Language.HEBREW)
+    degrees: List[Degree] = catalogue.load_degrees()
     degrees_names: List[str] = [_(degree.name) for degree in degrees]
-    db.save_settings(settings)
+    db.save_settings(create_settings(), get_session_id())
     return render_template("index.html", degrees=degrees_names)
 
 
@@ -54,15 +114,16 @@ def generate():
     if not degrees_names or not campus or not courses_names:
         return jsonify({"message": "נא לבחור תואר, קמפוס וקורסים"}), 400
 
-    degrees = {degree for degree in db.load_degrees() if _(degree.name) in degrees_names}
-    courses = db.load_courses(Language.get_current(), degrees)
+    degrees = {degree for degree in catalogue.load_degrees() if _(degree.name) in degrees_names}
+    courses = catalogue.load_courses(Language.get_current(), degrees)
     courses = [course for course in courses if course.name in courses_names]
 
-    settings = db.load_settings()
+    session_id = get_session_id()
+    settings = load_settings()
     settings.output_formats = [OutputFormat.IMAGE]
     settings.campus_name = campus
     settings.degrees = degrees
-    db.save_settings(settings)
+    db.save_settings(settings, session_id)
     parent_courses_ids = {course.parent_course_number for course in courses}
     language = settings.language
     activities = db.load_activities_by_parent_courses_numbers(parent_courses_ids, campus, language, degrees, settings)
@@ -73,16 +134,20 @@ def generate():
     if status is Status.FAILED or not schedules:
         return jsonify({"message": "לא היה ניתן ליצור מערכת שעות, נא לבחור קורסים אחרים."}), 400
 
-    results_path = utils.get_results_path()
-    Controller.save_schedules(schedules, settings, results_path)
-    logger.info("Finished saving schedules")
-    # Create a ZIP file
-    message = _("The schedules were saved in the directory: ") + str(results_path)
-    logger.info(message)
-    zip_file = results_path.parent / "semester_organizer_generated_schedules.zip"
-    zip_file.unlink(missing_ok=True)
-
-    shutil.make_archive(str(zip_file).replace(".zip", ""), 'zip', results_path)
+    # Every session has its own results folder, so concurrent users don't overwrite each other's results.
+    sessions_path = utils.get_results_path() / "sessions"
+    remove_old_sessions_results(sessions_path)
+    session_path = sessions_path / session_id
+    session_path.mkdir(parents=True, exist_ok=True)
+    zip_file = session_path / "semester_organizer_generated_schedules.zip"
+    # Only the zip file is kept, the schedules files are removed after they are archived.
+    with tempfile.TemporaryDirectory(dir=session_path) as results_path:
+        Controller.save_schedules(schedules, settings, Path(results_path), convertor=Convertor())
+        logger.info("Finished saving schedules")
+        # Create a ZIP file
+        zip_file.unlink(missing_ok=True)
+        shutil.make_archive(str(zip_file).replace(".zip", ""), 'zip', results_path)
+    logger.info("The schedules were saved in the file: %s", zip_file)
     session["zip"] = str(zip_file)
 
     return jsonify({
@@ -93,7 +158,7 @@ def generate():
 
 @app.route("/download_zip", methods=["POST"])
 def download_zip():
-    if "zip" not in session:
+    if "zip" not in session or not Path(session["zip"]).exists():
         return jsonify({"message": "לא נמצא קובץ להורדה"}), 400
     return send_file(session["zip"], as_attachment=True)
 
@@ -117,17 +182,42 @@ def get_campuses():
 def get_courses():
     degrees_names: List[str] = request.json["degrees"]
     campus: str = request.json["campus"]
-    degrees = {degree for degree in db.load_degrees() if _(degree.name) in degrees_names}
+    degrees = {degree for degree in catalogue.load_degrees() if _(degree.name) in degrees_names}
 
-    setting = db.load_settings()
+    setting = load_settings()
     setting.campus_name = campus
     setting.degrees = degrees
-    db.save_settings(setting)
+    db.save_settings(setting, get_session_id())
 
-    courses: List[Course] = db.load_courses(Language.get_current(), degrees)
+    courses: List[Course] = catalogue.load_courses(Language.get_current(), degrees)
     courses_names = list(sorted([course.name for course in courses]))
     return jsonify(courses_names)
 
 
+@app.route("/search_courses", methods=["POST"])
+def search_courses():
+    invalid_request = jsonify({"message": "בקשה לא תקינה"}), 400
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return invalid_request
+    prefix = data.get("prefix", "")
+    degrees_names = data.get("degrees", [])
+    campus = data.get("campus", "")
+    if not isinstance(prefix, str) or not isinstance(degrees_names, list) or not isinstance(campus, str):
+        return invalid_request
+    try:
+        limit = int(data.get("limit", 10))
+    except (TypeError, ValueError):
+        return invalid_request
+    # SQLite treats a negative limit as no limit
+    limit = max(1, min(limit, 50))
+    if campus and campus not in {*db.load_campus_names(Language.ENGLISH), *db.load_campus_names(Language.HEBREW)}:
+        return invalid_request
+    degrees = {degree for degree in catalogue.load_degrees() if _(degree.name) in degrees_names}
+    if not prefix.strip() or not degrees:
+        return jsonify([])
+    return jsonify(db.search_courses(prefix, campus or None, degrees, limit))
+
+
 if __name__ == "__main__":
     app.run(debug=True, port=5000)
@@ -8,6 +8,7 @@ from argparse import ArgumentParser
 import argcomplete
 
 from src import utils
+from src.collector.catalogue_service import CatalogueService
 from src.collector.db import Database
 from src.controller.controller import Controller
 from src.algorithms.constraint_courses import ConstraintCourses
@@ -26,6 +27,8 @@ def get_args():
     parser.add_argument("-l", "--language", help="Set the language of the program", choices=list(Language),
                         type=Language.from_str, default=Language.get_default())
     parser.add_argument("-v", "--verbose", help="Print more debug logs", default=False, action="store_true")
+    parser.add_argument("--profile_queries", default=False, action="store_true",
+                        help="Log the slow database queries and a summary of the queries at the end")
     parser.add_argument("--database_path", default="", type=pathlib.Path,
                         help="Path to database file (.db) Update database by given .db file, "
                              "that can be downloaded from the server (currently the github)")
@@ -36,23 +39,32 @@ def get_args():
 def main():
     utils.init_project()
     args = get_args()
-    utils.config_logging_level(logging.DEBUG if args.verbose else logging.ERROR)
+    if args.verbose:
+        utils.config_logging_level(logging.DEBUG)
+    else:
+        utils.config_logging_level(logging.INFO if args.profile_queries else logging.ERROR)
+    if args.profile_queries:
+        Database.query_profiler.enable()
     Language.set_current(args.language)
-    database = Database()
+    catalogue = CatalogueService()
+    database = catalogue.database
 
     if args.username and args.password:
         database.save_user_data(User(args.username, args.password))
 
     if args.flow is Flow.CONSOLE:
-        Controller(verbose=args.verbose).run_console_flow()
+        Controller(verbose=args.verbose, catalogue=catalogue).run_console_flow()
 
     elif args.flow is Flow.UPDATE_DATABASE:
         message = _("Database path is not a file or doesn't exists, the path given is: ")
         assert args.database_path.is_file(), message + str(args.database_path)
-        database.update_database(args.database_path)
+        catalogue.update_database(args.database_path)
 
     elif args.flow is Flow.UPDATE_GENERATED_JSON_DATA:
-        ConstraintCourses().export_generated_json_data()
+        ConstraintCourses(catalogue).export_generated_json_data()
+
+    if args.profile_queries:
+        Database.query_profiler.log_summary()
 
 
 if __name__ == '__main__':
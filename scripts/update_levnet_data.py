@@ -49,8 +49,10 @@ def run_update_levnet_data_flow():
     logger.debug("The username and password are valid")
 
     database.clear_all_data()
+    # The shared database is shipped migrated, the entry points only check its schema version.
     database.init_database_tables()
-    logger.debug("The database was cleared successfully")
+    logger.debug("The database was cleared and migrated to schema version %d successfully",
+                 database.load_shared_schema_version())
 
     network.change_language(Language.ENGLISH)
     english_campuses = network.extract_campuses()
@@ -64,8 +66,11 @@ def run_update_levnet_data_flow():
 
     campuses = {key: (english_campuses[key], hebrew_campuses[key]) for key in english_campuses.keys()}
 
-    database.save_campuses(campuses)
-    database.save_degrees(list(Degree))
+    # The database is rebuilt from scratch, so a crash only requires to run the flow again.
+    # Every group of saves is a short transaction, the network requests run outside of them.
+    with database.bulk_write(database.shared_database_path, synchronous_off=True):
+        database.save_campuses(campuses)
+        database.save_degrees(list(Degree))
     languages = [Language[args.language.upper()]] if args.language else list(Language)
 
     for language in languages:
@@ -85,8 +90,6 @@ def run_update_levnet_data_flow():
                 logger.debug("The courses were extracted successfully")
                 logger.debug("The courses are: %s", ", ".join([course.name for course in courses]))
 
-                database.save_courses(courses, language)
-
                 logger.debug("Extracting data for campus: %s in language %s", campus_name, language.name)
                 logger.debug("Start extracting the academic activities data for the campus: %s", campus_name)
                 activities, missings = network.extract_academic_activities_data(campus_name, courses)
@@ -96,7 +99,16 @@ def run_update_levnet_data_flow():
                     logger.debug("The academic activities data were extracted with errors")
                     logger.debug("The missing courses are: %s", ', '.join(missings))
 
-                database.save_academic_activities(activities, campus_name, language)
+                with database.bulk_write(database.shared_database_path, synchronous_off=True):
+                    database.save_courses(courses, language)
+                    database.save_academic_activities(activities, campus_name, language)
+
+    database.materialize_courses_choices()
+    logger.debug("The courses choices were materialized successfully")
+    database.index_courses_search()
+    logger.debug("The courses search index was built successfully")
+    database.analyze_shared_database()
+    logger.debug("The database statistics were analyzed successfully")
     end = timer()
     logger.debug("The levnet data was updated successfully in %s time", str(timedelta(seconds=end - start)))
 
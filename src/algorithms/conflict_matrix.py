@@ -0,0 +1,78 @@
+from typing import List, Dict
+
+import numpy as np
+
+from src.data.activity import Activity
+
+
+class ConflictMatrix:
+    """
+    Batch version of Activity.is_crash_with_activity.
+    All the meetings of the activities are kept as interval arrays (day, start, end, attendance required)
+    and compared all at once, the result is the activity x activity conflict matrix.
+    """
+
+    def __init__(self, activities: List[Activity]):
+        self._indexes: Dict[int, int] = {}
+        self.activities = []
+        for activity in activities:
+            if id(activity) not in self._indexes:
+                self._indexes[id(activity)] = len(self.activities)
+                self.activities.append(activity)
+
+        meetings_data = [(index, meeting.day.value, meeting.get_start_time_in_minutes(),
+                          meeting.get_end_time_in_minutes(), activity.attendance_required)
+                         for index, activity in enumerate(self.activities) for meeting in activity.meetings]
+        meetings_data = np.array(meetings_data, dtype=np.int32).reshape(-1, 5)
+        self.meetings_activity = meetings_data[:, 0]
+        self.days = meetings_data[:, 1]
+        self.starts = meetings_data[:, 2]
+        self.ends = meetings_data[:, 3]
+        self.attendance_required = meetings_data[:, 4].astype(bool)
+        self.matrix = self._compute_activities_conflicts()
+
+    def _compute_activities_conflicts(self) -> np.ndarray:
+        activities_count = len(self.activities)
+        matrix = np.zeros((activities_count, activities_count), dtype=bool)
+        if not self.meetings_activity.size:
+            return matrix
+
+        same_day = self.days[:, None] == self.days[None, :]
+        overlap = (self.starts[:, None] < self.ends[None, :]) & (self.starts[None, :] < self.ends[:, None])
+        required = self.attendance_required[:, None] & self.attendance_required[None, :]
+        meetings_conflicts = same_day & overlap & required
+
+        # The meetings are ordered by their activity, reduce each group of rows and columns to its activity.
+        meetings_count = np.bincount(self.meetings_activity, minlength=activities_count)
+        with_meetings = np.flatnonzero(meetings_count)
+        offsets = np.concatenate(([0], np.cumsum(meetings_count[with_meetings])[:-1]))
+        reduced = np.logical_or.reduceat(meetings_conflicts, offsets, axis=0)
+        reduced = np.logical_or.reduceat(reduced, offsets, axis=1)
+        matrix[np.ix_(with_meetings, with_meetings)] = reduced
+        return matrix
+
+    def is_crash(self, activity: Activity, other: Activity) -> bool:
+        return bool(self.matrix[self._indexes[id(activity)], self._indexes[id(other)]])
+
+    def _options_incidence(self, options: List[List[Activity]]) -> np.ndarray:
+        incidence = np.zeros((len(options), len(self.activities)), dtype=np.float32)
+        for option_index, option in enumerate(options):
+            incidence[option_index, [self._indexes[id(activity)] for activity in option]] = 1
+        return incidence
+
+    def options_conflicts(self, options: List[List[Activity]], other_options: List[List[Activity]]) -> np.ndarray:
+        """
+        :return: boolean matrix, cell [i][j] is True if any activity of options[i] crash with any of other_options[j]
+        """
+        incidence = self._options_incidence(options)
+        other_incidence = self._options_incidence(other_options)
+        return (incidence @ self.matrix.astype(np.float32) @ other_incidence.T) > 0
+
+    def options_self_conflicts(self, options: List[List[Activity]]) -> np.ndarray:
+        """
+        :return: boolean vector, cell [i] is True if two different activities of options[i] crash with each other
+        """
+        incidence = self._options_incidence(options)
+        matrix = self.matrix.astype(np.float32)
+        np.fill_diagonal(matrix, 0)
+        return ((incidence @ matrix) * incidence).sum(axis=1) > 0
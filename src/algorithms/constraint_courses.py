@@ -1,8 +1,8 @@
 from pathlib import Path
-from typing import Set, Dict, Tuple
+from typing import Optional, Set, Dict, Tuple
 
 from functools import lru_cache
-from src.collector.db import Database
+from src.collector.catalogue_service import CatalogueService
 from src.data.course_constraint import CourseConstraint
 from src.data.degree import Degree
 from src.data.language import Language
@@ -24,8 +24,9 @@ class ConstraintCourses:
     PERSONAL_BLOCKS_COURSES_PATH = GENERATED_DATA_PATH / "personal_blocks_courses.json"
     PERSONAL_ALL_INFO_PATH = GENERATED_DATA_PATH / "personal_all_courses_blocked_and_blocks_info.json"
 
-    def __init__(self):
-        self.database = Database()
+    def __init__(self, catalogue: Optional[CatalogueService] = None):
+        self.catalogue = catalogue or CatalogueService()
+        self.database = self.catalogue.database
         self.course_constraint = CourseConstraint()
 
     def export_data(self, are_blocked_by_result: Dict, blocks_courses_result: Dict,
@@ -65,7 +66,8 @@ class ConstraintCourses:
 
     @lru_cache(maxsize=128)
     def prepare_data(self) -> (Dict[Name, CourseConstraint], Dict[Name, Set[Name]], Dict[Name, Set[Name]]):
-        all_courses_in_json = self.course_constraint.extract_courses_data(self.CONSTRAINT_COURSES_DATA_PATH)
+        all_courses_in_json = self.course_constraint.extract_courses_data(self.CONSTRAINT_COURSES_DATA_PATH,
+                                                                          self.catalogue)
         are_blocked_by_result = self.course_constraint.get_extended_blocked_by_courses(all_courses_in_json)
         blocks_courses_result = self.course_constraint.get_extended_blocks_courses(are_blocked_by_result)
         return all_courses_in_json, are_blocked_by_result, blocks_courses_result
@@ -91,7 +93,7 @@ class ConstraintCourses:
                                  for constraint_course in are_blocked_by_result.values()}
 
         degrees = {Degree.SOFTWARE_ENGINEERING, Degree.COMPUTER_SCIENCE}
-        all_courses = self.database.load_courses(Language.HEBREW, degrees)
+        all_courses = self.catalogue.get_view(Language.HEBREW, degrees).courses
         courses_already_done = self.database.load_courses_already_done(Language.HEBREW)
         courses_already_done_numbers = {course.course_number for course in courses_already_done}
         result = set()
@@ -2,15 +2,14 @@ from enum import Enum, auto
 from typing import List, Optional, Dict, Set
 
 from constraint.problem import Problem
-from constraint.constraints import AllEqualConstraint
 
+from src.algorithms.conflict_matrix import ConflictMatrix
 from src.data.activity import Activity
 from src.data.course_choice import CourseChoice
 from src.data.day import Day
 from src.data.degree import Degree
 from src.data.schedule import Schedule
 from src.data.settings import Settings
-from src.data.translation import _
 
 
 class Status(Enum):
@@ -25,11 +24,17 @@ class CSP:
     def __init__(self):
         self.courses_degrees = None
         self.activities_ids_groups = None
+        self._activities_ids_tracks = {}
         self.courses_choices = None
         self.consist_one_favorite_teacher = False
         self.settings = None
         self.status = None
         self.last_courses_crashed = (None, None)
+        self._conflict_matrix = None
+        self._options_by_name = {}
+        self._options_indexes = {}
+        self._options_conflicts = {}
+        self._options_self_conflicts = {}
 
     def extract_schedules_minimal_consists(self, activities: List[Activity],
                                            activities_ids_groups: Dict[str, Set[int]] = None) -> List[Schedule]:
@@ -41,6 +46,7 @@ class CSP:
         """
         all_activities_names, problem = self._prepare_activities(activities)
         self.activities_ids_groups = activities_ids_groups
+        self._activities_ids_tracks = self._get_activities_ids_tracks(activities_ids_groups)
         self.status = Status.SUCCESS
         for name in all_activities_names:
             for other_name in all_activities_names:
@@ -67,6 +73,7 @@ class CSP:
         self.settings = settings or Settings()
         self.courses_choices = courses_choices or {}
         self.activities_ids_groups = activities_ids_groups
+        self._activities_ids_tracks = self._get_activities_ids_tracks(activities_ids_groups)
         self.courses_degrees = courses_degrees or {}
         all_activities_names, problem = self._prepare_activities(activities)
 
@@ -117,8 +124,30 @@ class CSP:
     def get_last_activities_crashed(self):
         return self.last_courses_crashed
 
+    @staticmethod
+    def _get_activities_ids_tracks(activities_ids_groups: Optional[Dict[str, Set[int]]]) -> Dict[str, int]:
+        """
+        :return: bitset of the tracks of every activity id, every track is a single bit.
+        """
+        activities_ids_groups = activities_ids_groups or {}
+        all_tracks = sorted({track for tracks in activities_ids_groups.values() for track in tracks})
+        tracks_bits = {track: 1 << index for index, track in enumerate(all_tracks)}
+        return {activity_id: sum(tracks_bits[track] for track in tracks)
+                for activity_id, tracks in activities_ids_groups.items()}
+
+    def _get_options_conflicts(self, name: str, other_name: str):
+        key = (name, other_name)
+        if key not in self._options_conflicts:
+            self._options_conflicts[key] = self._conflict_matrix.options_conflicts(self._options_by_name[name],
+                                                                                   self._options_by_name[other_name])
+        return self._options_conflicts[key]
+
     def _is_consist_activity(self, group_one: List[Activity], group_two: List[Activity]):
-        result = all(not activity.is_crash_with_activities(group_one) for activity in group_two)
+        if id(group_one) in self._options_indexes and id(group_two) in self._options_indexes:
+            conflicts = self._get_options_conflicts(group_one[0].name, group_two[0].name)
+            result = not conflicts[self._options_indexes[id(group_one)], self._options_indexes[id(group_two)]]
+        else:
+            result = all(not activity.is_crash_with_activities(group_one) for activity in group_two)
         if not result:
             self.last_courses_crashed = (group_one[0].name, group_two[0].name)
         return result
@@ -133,6 +162,8 @@ class CSP:
         return all(activity.type.is_personal() or activity.is_have_free_places() for activity in activities)
 
     def _is_consist_itself(self, activities: List[Activity]):
+        if id(activities) in self._options_indexes:
+            return not self._options_self_conflicts[activities[0].name][self._options_indexes[id(activities)]]
         for i, activity in enumerate(activities):
             for j in range(i + 1, len(activities)):
                 if activity.is_crash_with_activity(activities[j]):
@@ -204,23 +235,30 @@ class CSP:
             if self.settings.degrees - course_degrees and not {self.settings.degree} & course_degrees:
                 return True
 
-        all_activities_ids_found = all(activity.activity_id in self.activities_ids_groups for activity in activities)
-        if not all_activities_ids_found:
-            return False
-
-        problem = Problem()
+        # All the activities should be in at least one common track
+        common_tracks = -1
         for activity in activities:
-            problem.addVariable(activity.activity_id, list(self.activities_ids_groups[activity.activity_id]))
-            problem.addConstraint(AllEqualConstraint())
-        return problem.getSolution() is not None
+            tracks = self._activities_ids_tracks.get(activity.activity_id)
+            if tracks is None:
+                return False
+            common_tracks &= tracks
+        return common_tracks != 0
 
     def _prepare_activities(self, activities: List[Activity]):
         problem = Problem()
         activities_by_name = Activity.get_activities_by_name(activities)
+        self._conflict_matrix = ConflictMatrix(activities)
+        self._options_by_name = {}
+        self._options_indexes = {}
+        self._options_conflicts = {}
+        self._options_self_conflicts = {}
 
         for name, activities_values in activities_by_name.items():
             flat_activities_by_type = Activity.extract_flat_activities_by_type(activities_values)
             options_for_activity = Activity.extract_all_options_of_activity(flat_activities_by_type)
+            self._options_by_name[name] = options_for_activity
+            self._options_indexes.update({id(option): index for index, option in enumerate(options_for_activity)})
+            self._options_self_conflicts[name] = self._conflict_matrix.options_self_conflicts(options_for_activity)
             problem.addVariable(name, options_for_activity)
 
         all_activities_names = list(activities_by_name.keys())
@@ -228,18 +266,12 @@ class CSP:
         return all_activities_names, problem
 
     def _extract_solutions(self, problem: Problem) -> List[Schedule]:
-        activities_result = []
+        names = list(self._options_by_name.keys())
+        options_table = tuple(self._options_by_name.values())
         schedule_result = []
-        option_counter = 1
-
-        for solution in problem.getSolutions():
-            activities_result.clear()
-            for activities_solution in solution.values():
-                activities_result += activities_solution
-            name = f"{_('Option')} {option_counter}"
-            file_name = f"{_('option')}_{option_counter}"
-            schedule = Schedule(name, file_name, "", activities_result.copy())
-            schedule_result.append(schedule)
-            option_counter += 1
+
+        for option_counter, solution in enumerate(problem.getSolutionIter(), 1):
+            options_indexes = tuple(self._options_indexes[id(solution[name])] for name in names)
+            schedule_result.append(Schedule.from_options(option_counter, options_indexes, options_table))
 
         return schedule_result
@@ -0,0 +1,291 @@
+import contextlib
+import mmap
+import os
+import struct
+import threading
+from collections import defaultdict
+from pathlib import Path
+from sqlite3 import Cursor
+from typing import Callable, Collection, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.collector.database_snapshot import FileSignature
+from src.data.academic_activity import AcademicActivity
+from src.data.meeting import Meeting
+
+# Key of a section, campus id and language short name
+SectionKey = Tuple[int, str]
+# The activity values by Database.ACADEMIC_ACTIVITY_COLUMNS order and the group number
+ActivityRow = Sequence
+# Day, start and end time in minutes from midnight
+MeetingRow = Tuple[int, int, int]
+
+
+class Catalogue:
+    """
+    Binary snapshot of the academic activities and their meetings, by campus and language.
+    The file is memory-mapped and its fixed-width records are read through numpy views without copying them,
+    only the activities that are asked for are built.
+    The layout is: header, sections, activities, meetings, strings offsets and the strings data (UTF-8).
+    """
+
+    MAGIC = b"SOCATLG\0"
+    FORMAT_VERSION = 1
+    # Magic, format version, signature of the source database file (inode, mtime, size),
+    # number of sections, activities, meetings and strings, size of the strings data.
+    HEADER = struct.Struct("<8sIqqqIIIIQ")
+    NULL_STRING = -1
+    NULL_NUMBER = np.iinfo(np.int64).min
+
+    SECTION_DTYPE = np.dtype([
+        ("campus_id", "<i8"),
+        ("language_value", "S2"),
+        ("first_activity", "<u4"),
+        ("activities_count", "<u4"),
+    ])
+    # Fields by the AcademicActivity fields order, the strings are indexes in the strings table.
+    ACTIVITY_DTYPE = np.dtype([
+        ("name", "<i4"),
+        ("activity_type", "<i8"),
+        ("attendance_required", "<i8"),
+        ("lecturer_name", "<i4"),
+        ("course_number", "<i8"),
+        ("parent_course_number", "<i8"),
+        ("location", "<i4"),
+        ("activity_id", "<i4"),
+        ("description", "<i4"),
+        ("current_capacity", "<i8"),
+        ("max_capacity", "<i8"),
+        ("actual_course_number", "<i8"),
+        ("group_number", "<i8"),
+        ("first_meeting", "<u4"),
+        ("meetings_count", "<u4"),
+    ])
+    MEETING_DTYPE = np.dtype([
+        ("day", "<u1"),
+        ("start_minutes", "<u2"),
+        ("end_minutes", "<u2"),
+    ])
+    ACTIVITY_FIELDS = ACTIVITY_DTYPE.names[:13]
+    STRING_FIELDS = {"name", "lecturer_name", "location", "activity_id", "description"}
+
+    # The opened catalogues by their base path, shared by all the threads of the process.
+    _opened: Dict[str, "Catalogue"] = {}
+    # The signatures that failed to be exported by the base path, not exported again until the source is changed.
+    _failed_signatures: Dict[str, FileSignature] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, path: Path):
+        with open(path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, *signature, sections_count, activities_count, meetings_count, strings_count, strings_size = \
+            Catalogue.HEADER.unpack_from(self._mmap, 0)
+        if magic != Catalogue.MAGIC or version != Catalogue.FORMAT_VERSION:
+            raise ValueError(f"The file {path} isn't a catalogue file of version {Catalogue.FORMAT_VERSION}")
+        self.signature: FileSignature = tuple(signature)
+
+        offset = Catalogue.HEADER.size
+        self.sections, offset = self._view(Catalogue.SECTION_DTYPE, sections_count, offset)
+        self.activities, offset = self._view(Catalogue.ACTIVITY_DTYPE, activities_count, offset)
+        self.meetings, offset = self._view(Catalogue.MEETING_DTYPE, meetings_count, offset)
+        self._strings_offsets, offset = self._view(np.dtype("<u8"), strings_count + 1, offset)
+        self._strings_data_offset = offset
+        if offset + strings_size != len(self._mmap):
+            raise ValueError(f"The catalogue file {path} is corrupted")
+        self._sections_by_key: Dict[SectionKey, Tuple[int, int]] = {
+            (int(campus_id), language_value.decode()): (int(first_activity), int(activities_count))
+            for campus_id, language_value, first_activity, activities_count in self.sections.tolist()
+        }
+
+    @staticmethod
+    def get_path(base_path: Path, signature: FileSignature) -> Path:
+        """
+        Every version of the source database has its own catalogue file, so a file that is mapped by a reader
+        is never replaced (it can't be on Windows).
+        """
+        return base_path.with_name(f"{base_path.stem}.{'-'.join(map(str, signature))}{base_path.suffix}")
+
+    @staticmethod
+    def get_paths(base_path: Path) -> List[Path]:
+        """
+        :return: the catalogue files of all the versions of the source database.
+        """
+        return sorted(base_path.parent.glob(f"{base_path.stem}.*{base_path.suffix}"))
+
+    @staticmethod
+    def open(base_path: Path, signature: FileSignature, export: Callable[[], None]) -> Optional["Catalogue"]:
+        """
+        :param signature: signature of the source database file.
+        :param export: called to export the catalogue file if it's missing for this signature.
+        :return: the catalogue of the source database, it's kept open until the source database is changed.
+        None if it failed to be exported or opened for this signature before,
+        or if the source database was changed while it was exported.
+        """
+        key = str(base_path)
+        with Catalogue._lock:
+            catalogue = Catalogue._opened.get(key)
+            if catalogue and catalogue.signature == signature:
+                return catalogue
+            if Catalogue._failed_signatures.get(key) == signature:
+                return None
+            path = Catalogue.get_path(base_path, signature)
+            try:
+                if Catalogue.read_signature(path) != signature:
+                    export()
+                    if Catalogue.read_signature(path) != signature:
+                        return None
+                catalogue = Catalogue(path)
+            except Exception:
+                Catalogue._failed_signatures[key] = signature
+                raise
+            # The previous catalogue isn't closed, threads that still read it keep it alive.
+            Catalogue._opened[key] = catalogue
+            Catalogue._remove_old_files(base_path, path)
+            return catalogue
+
+    @staticmethod
+    def _remove_old_files(base_path: Path, current_path: Path):
+        # The newer files may be exported for a database that is about to replace the current one.
+        current_mtime = current_path.stat().st_mtime_ns
+        for path in Catalogue.get_paths(base_path):
+            # A file that is still mapped (on Windows) is removed by a later call
+            with contextlib.suppress(OSError):
+                if path.stat().st_mtime_ns < current_mtime:
+                    path.unlink()
+
+    def _view(self, dtype: np.dtype, count: int, offset: int) -> Tuple[np.ndarray, int]:
+        return np.frombuffer(self._mmap, dtype, count, offset), offset + dtype.itemsize * count
+
+    @staticmethod
+    def read_signature(path: Path) -> Optional[FileSignature]:
+        """
+        :return: signature of the source database file, None if the file isn't a valid catalogue file.
+        """
+        try:
+            with open(path, "rb") as file:
+                magic, version, *signature = Catalogue.HEADER.unpack(file.read(Catalogue.HEADER.size))[:5]
+        except (OSError, struct.error):
+            return None
+        if magic != Catalogue.MAGIC or version != Catalogue.FORMAT_VERSION:
+            return None
+        return tuple(signature)
+
+    def _get_string(self, index: int) -> Optional[str]:
+        if index == Catalogue.NULL_STRING:
+            return None
+        start, end = (self._strings_offsets[index:index + 2] + self._strings_data_offset).tolist()
+        return self._mmap[start:end].decode("utf-8")
+
+    def _get_value(self, field: str, value: int):
+        if field in Catalogue.STRING_FIELDS:
+            return self._get_string(value)
+        return None if value == Catalogue.NULL_NUMBER else value
+
+    def _create_activity(self, record: tuple) -> AcademicActivity:
+        """
+        :param record: the values of an activity record, the fields are read only when the activity is built.
+        """
+        *values, _group_number, first_meeting, meetings_count = record
+        activity = AcademicActivity(*[self._get_value(field, value)
+                                      for field, value in zip(Catalogue.ACTIVITY_FIELDS[:-1], values)])
+        activity.meetings = [Meeting.from_minutes(*meeting)
+                             for meeting in self.meetings[first_meeting:first_meeting + meetings_count].tolist()]
+        return activity
+
+    def load_activities(self, campus_id: int, language_value: str,
+                        parent_courses_numbers: Optional[Collection[int]] = None,
+                        activities_ids: Optional[Collection[str]] = None,
+                        excluded_groups: Optional[Collection[int]] = None) -> List[AcademicActivity]:
+        """
+        :param parent_courses_numbers: load only the activities of these courses, None for all the courses.
+        :param activities_ids: load only these activities, None for all the activities.
+        :param excluded_groups: don't load the activities of these groups numbers.
+        """
+        first_activity, activities_count = self._sections_by_key.get((campus_id, language_value), (0, 0))
+        records = self.activities[first_activity:first_activity + activities_count]
+        mask = np.ones(len(records), dtype=bool)
+        if parent_courses_numbers is not None:
+            mask &= np.isin(records["parent_course_number"], np.fromiter(parent_courses_numbers, np.int64))
+        if excluded_groups:
+            mask &= ~np.isin(records["group_number"], np.fromiter(excluded_groups, np.int64))
+
+        selected_records = records[mask].tolist()
+        if activities_ids is not None:
+            activities_ids = set(activities_ids)
+            activity_id_index = Catalogue.ACTIVITY_DTYPE.names.index("activity_id")
+            selected_records = [record for record in selected_records
+                                if self._get_string(record[activity_id_index]) in activities_ids]
+        return [self._create_activity(record) for record in selected_records]
+
+    def close(self):
+        # The views must be released before the memory map is closed
+        self.sections = self.activities = self.meetings = self._strings_offsets = None
+        self._mmap.close()
+
+    @staticmethod
+    def write(path: Path, signature: FileSignature,
+              sections: Dict[SectionKey, List[Tuple[ActivityRow, List[MeetingRow]]]]):
+        """
+        Write the catalogue to a temporary file and replace the file at path with it.
+        :param sections: the activities rows and their meetings by campus id and language short name.
+        """
+        strings_indexes: Dict[str, int] = {}
+        sections_records = []
+        activities_records = []
+        meetings_records = []
+        for (campus_id, language_value), activities in sections.items():
+            sections_records.append((campus_id, language_value.encode(), len(activities_records), len(activities)))
+            for activity_row, meetings in activities:
+                values = []
+                for field, value in zip(Catalogue.ACTIVITY_FIELDS, activity_row):
+                    if field in Catalogue.STRING_FIELDS:
+                        value = Catalogue.NULL_STRING if value is None else strings_indexes.setdefault(
+                            value, len(strings_indexes))
+                    elif value is None:
+                        value = Catalogue.NULL_NUMBER
+                    values.append(value)
+                activities_records.append((*values, len(meetings_records), len(meetings)))
+                meetings_records.extend(meetings)
+
+        strings_data = [text.encode("utf-8") for text in strings_indexes]
+        strings_offsets = np.zeros(len(strings_data) + 1, dtype="<u8")
+        strings_offsets[1:] = np.cumsum([len(data) for data in strings_data])
+        strings_size = int(strings_offsets[-1])
+        arrays = [
+            np.array(sections_records, dtype=Catalogue.SECTION_DTYPE),
+            np.array(activities_records, dtype=Catalogue.ACTIVITY_DTYPE),
+            np.array(meetings_records, dtype=Catalogue.MEETING_DTYPE),
+            strings_offsets,
+        ]
+        temporary_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(temporary_path, "wb") as file:
+            file.write(Catalogue.HEADER.pack(Catalogue.MAGIC, Catalogue.FORMAT_VERSION, *signature,
+                                             len(sections_records), len(activities_records), len(meetings_records),
+                                             len(strings_data), strings_size))
+            for array in arrays:
+                file.write(array.tobytes())
+            file.write(b"".join(strings_data))
+        os.replace(temporary_path, path)
+
+    @staticmethod
+    def export(cursor: Cursor, base_path: Path, signature: FileSignature, columns_text: str):
+        """
+        Export the activities and the meetings of the shared database that the cursor is connected to,
+        to the catalogue file of its signature.
+        :param columns_text: the activities columns that build AcademicActivity, by its fields order.
+        """
+        cursor.execute("SELECT activity_id, language_value, day, start_minutes, end_minutes FROM meetings "
+                       "ORDER BY activity_id, language_value, day, start_minutes, end_minutes;")
+        meetings_by_key = defaultdict(list)
+        for activity_id, language_value, *meeting in cursor.fetchall():
+            meetings_by_key[(activity_id, language_value)].append(tuple(meeting))
+        cursor.execute(f"SELECT activities.campus_id, activities.language_value, {columns_text}, "
+                       "activities.group_number FROM activities "
+                       "ORDER BY activities.campus_id, activities.language_value, activities.rowid;")
+        sections = defaultdict(list)
+        for campus_id, language_value, *activity_row in cursor.fetchall():
+            activity_id = activity_row[7]
+            sections[(campus_id, language_value)].append((activity_row,
+                                                          meetings_by_key.get((activity_id, language_value), [])))
+        Catalogue.write(Catalogue.get_path(base_path, signature), signature, sections)
@@ -0,0 +1,97 @@
+import threading
+from collections import OrderedDict
+from functools import cached_property
+from pathlib import Path
+from typing import Collection, Dict, FrozenSet, Hashable, List, Optional, Tuple
+
+from src.collector.db import Database
+from src.data.course import Course
+from src.data.degree import Degree
+from src.data.language import Language
+
+# Campus name (None for all the campuses), language and degrees
+ViewKey = Tuple[Optional[str], Language, FrozenSet[Degree]]
+
+
+class CatalogueView:
+    """
+    The courses of a campus, language and degrees, loaded once on the first use.
+    The courses are shared by all the users of the catalogue service and shouldn't be changed.
+    """
+
+    def __init__(self, database: Database, campus_name: Optional[str], language: Language,
+                 degrees: FrozenSet[Degree]):
+        self.database = database
+        self.campus_name = campus_name
+        self.language = language
+        self.degrees = degrees
+
+    @cached_property
+    def courses(self) -> Tuple[Course, ...]:
+        if self.campus_name is None:
+            return tuple(self.database.load_courses(self.language, set(self.degrees)))
+        return tuple(self.database.load_active_courses(self.campus_name, self.language, self.degrees))
+
+    @cached_property
+    def courses_by_number(self) -> Dict[int, Course]:
+        return {course.course_number: course for course in self.courses}
+
+    @cached_property
+    def courses_by_name(self) -> Dict[str, Course]:
+        return {course.name: course for course in self.courses}
+
+
+class CatalogueService:
+    """
+    Read-through cache of the courses of the shared database, shared by the entry points of a process
+    (the controller, the constraint courses and the web app) instead of every one of them loading its own copy.
+    Keeps the least recently used views, they are dropped when the shared database is changed.
+    """
+
+    MAX_VIEWS = 64
+
+    def __init__(self, database: Optional[Database] = None, max_views: int = MAX_VIEWS):
+        self.database = database or Database()
+        self.max_views = max_views
+        self._lock = threading.Lock()
+        self._version: Hashable = None
+        self._views: "OrderedDict[ViewKey, CatalogueView]" = OrderedDict()
+
+    def get_view(self, language: Language, degrees: Optional[Collection[Degree]] = None,
+                 campus_name: Optional[str] = None) -> CatalogueView:
+        """
+        :param degrees: the default is the default degrees.
+        :param campus_name: only the active courses of the campus, None for all the courses.
+        """
+        key = (campus_name, language, frozenset(degrees or Degree.get_defaults()))
+        version = self.database.get_shared_version()
+        with self._lock:
+            if version != self._version:
+                self._views.clear()
+                self._version = version
+            view = self._views.get(key)
+            if view is None:
+                view = self._views[key] = CatalogueView(self.database, *key)
+            self._views.move_to_end(key)
+            while len(self._views) > self.max_views:
+                self._views.popitem(last=False)
+        return view
+
+    def load_courses(self, language: Language, degrees: Optional[Collection[Degree]] = None,
+                     campus_name: Optional[str] = None) -> List[Course]:
+        """
+        :return: a new list of the shared courses, the courses shouldn't be changed.
+        """
+        return list(self.get_view(language, degrees, campus_name).courses)
+
+    def load_degrees(self) -> List[Degree]:
+        return self.database.load_degrees()
+
+    def invalidate(self):
+        with self._lock:
+            self._views.clear()
+            self._version = None
+
+    def update_database(self, database_path: Path):
+        self.database.update_database(database_path)
+        self.invalidate()
@@ -0,0 +1,104 @@
+import contextlib
+import os
+import sqlite3
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+FileIdentity = Tuple[int, int]
+
+
+@dataclass
+class PooledConnection:
+    connection: sqlite3.Connection
+    identity: Optional[FileIdentity]
+    generation: int
+    depth: int = 0
+
+
+class ConnectionPool:
+    """
+    Keep a long-lived sqlite connection per thread and per database file instead of opening one for every query.
+    A connection is reopened when its database file was removed or replaced, or after invalidate() was called.
+    """
+
+    # Negative value is in KiB
+    CACHE_SIZE = -16 * 1024
+    MMAP_SIZE = 256 * 1024 * 1024
+    CACHED_STATEMENTS = 256
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._generations: Dict[str, int] = {}
+
+    @staticmethod
+    def _get_identity(database_file: Path) -> Optional[FileIdentity]:
+        try:
+            stat = os.stat(database_file)
+        except FileNotFoundError:
+            return None
+        return stat.st_dev, stat.st_ino
+
+    def _get_connections(self) -> Dict[str, PooledConnection]:
+        if not hasattr(self._local, "connections"):
+            self._local.connections = {}
+        return self._local.connections
+
+    def _open(self, database_file: Path, use_wal: bool) -> sqlite3.Connection:
+        connection = sqlite3.connect(database_file, cached_statements=ConnectionPool.CACHED_STATEMENTS)
+        connection.execute(f"PRAGMA cache_size = {ConnectionPool.CACHE_SIZE};")
+        connection.execute(f"PRAGMA mmap_size = {ConnectionPool.MMAP_SIZE};")
+        connection.execute("PRAGMA temp_store = MEMORY;")
+        if use_wal:
+            connection.execute("PRAGMA journal_mode = WAL;")
+            connection.execute("PRAGMA synchronous = NORMAL;")
+        return connection
+
+    def _is_valid(self, pooled: PooledConnection, key: str, database_file: Path) -> bool:
+        is_same_file = pooled.identity is not None and pooled.identity == self._get_identity(database_file)
+        return is_same_file and pooled.generation == self._generations.get(key, 0)
+
+    @contextlib.contextmanager
+    def connect(self, database_file: Path, use_wal: bool = False) -> Iterator[sqlite3.Connection]:
+        """
+        Nested calls in the same thread share the same connection,
+        the transaction is committed (or rolled back on error) only when the outermost call ends.
+        :param use_wal: set journal mode WAL, shouldn't be used for database files that are shipped as is.
+        """
+        key = str(database_file)
+        connections = self._get_connections()
+        pooled = connections.get(key)
+        if pooled and pooled.depth == 0 and not self._is_valid(pooled, key, database_file):
+            pooled.connection.close()
+            pooled = None
+        if not pooled:
+            connection = self._open(database_file, use_wal)
+            pooled = PooledConnection(connection, self._get_identity(database_file), self._generations.get(key, 0))
+            connections[key] = pooled
+
+        pooled.depth += 1
+        try:
+            yield pooled.connection
+            if pooled.depth == 1:
+                pooled.connection.commit()
+        except BaseException:
+            if pooled.depth == 1:
+                pooled.connection.rollback()
+            raise
+        finally:
+            pooled.depth -= 1
+
+    def invalidate(self, database_file: Path):
+        """
+        Close the connection of the current thread to the database file,
+        connections of other threads are reopened on their next use.
+        """
+        key = str(database_file)
+        with self._lock:
+            self._generations[key] = self._generations.get(key, 0) + 1
+        pooled = self._get_connections().get(key)
+        if pooled and pooled.depth == 0:
+            pooled.connection.close()
+            del self._get_connections()[key]
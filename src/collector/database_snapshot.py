@@ -0,0 +1,105 @@
+import contextlib
+import itertools
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+
+FileSignature = Tuple[int, int, int]
+
+
+def get_file_signature(database_file: Path) -> Optional[FileSignature]:
+    """
+    :return: signature that is changed when the file is written or replaced, None if the file doesn't exist.
+    """
+    try:
+        stat = os.stat(database_file)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+class DatabaseSnapshot:
+    """
+    Read-only in-memory copy of a database file that is shared by all the threads of the process.
+    Every thread reads the copy through its own connection, the copy is reloaded when the file is changed.
+    """
+
+    _names = itertools.count()
+
+    def __init__(self, database_file: Path, check_interval: float = 1.0):
+        """
+        :param check_interval: minimum seconds between two checks if the database file was changed.
+        """
+        self.database_file = database_file
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # Keeps the current in-memory database alive, it's removed when its last connection is closed.
+        self._holder: Optional[sqlite3.Connection] = None
+        self._uri: Optional[str] = None
+        self._signature: Optional[FileSignature] = None
+        self._last_check = 0.0
+
+    @property
+    def signature(self) -> Optional[FileSignature]:
+        """
+        :return: signature of the database file when the current copy was taken.
+        """
+        return self._signature
+
+    def _load(self):
+        uri = f"file:database_snapshot_{next(DatabaseSnapshot._names)}?mode=memory&cache=shared"
+        holder = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        # Take the signature before the copy, a change while copying is caught by the next check.
+        signature = get_file_signature(self.database_file)
+        if signature:
+            source_uri = f"{Path(self.database_file).absolute().as_uri()}?mode=ro"
+            with contextlib.closing(sqlite3.connect(source_uri, uri=True)) as source:
+                source.backup(holder)
+        old_holder = self._holder
+        self._holder, self._uri, self._signature = holder, uri, signature
+        if old_holder:
+            # Threads in the middle of a read keep the old copy alive until they reconnect.
+            old_holder.close()
+
+    def reload(self):
+        with self._lock:
+            self._load()
+            self._last_check = time.monotonic()
+
+    def _reload_if_changed(self):
+        now = time.monotonic()
+        if self._uri and now - self._last_check < self.check_interval:
+            return
+        with self._lock:
+            if not self._uri or get_file_signature(self.database_file) != self._signature:
+                self._load()
+            self._last_check = now
+
+    @contextlib.contextmanager
+    def connect(self) -> Iterator[sqlite3.Connection]:
+        """
+        Nested calls in the same thread share the same connection (and the same copy).
+        The connection is read only, any write raises sqlite3.OperationalError.
+        """
+        local = self._local
+        if not getattr(local, "depth", 0):
+            self._reload_if_changed()
+            if getattr(local, "uri", None) != self._uri:
+                if getattr(local, "connection", None):
+                    local.connection.close()
+                # Connect while the copy can't be replaced, otherwise a new empty database may be created.
+                with self._lock:
+                    local.connection = sqlite3.connect(self._uri, uri=True)
+                    local.uri = self._uri
+                local.connection.execute("PRAGMA query_only = ON;")
+                local.depth = 0
+
+        local.depth += 1
+        try:
+            yield local.connection
+        finally:
+            local.depth -= 1
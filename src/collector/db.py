@@ -1,19 +1,28 @@
 import json
-import re
 from pathlib import Path
 import shutil
 import contextlib
-import sqlite3 as database
+import copy
+import inspect
+import os
 from collections import defaultdict
 from sqlite3 import OperationalError, Connection, Cursor
-from typing import List, Optional, Dict, Tuple, Collection, Set
+from typing import List, Optional, Dict, Tuple, Collection, Set, Callable, Hashable, TypeVar
 
 from src import utils
+from src.collector import migrations
+from src.collector.catalogue import Catalogue
+from src.collector.connection_pool import ConnectionPool
+from src.collector.database_snapshot import DatabaseSnapshot, get_file_signature
+from src.collector.lookup_cache import LookupCache
+from src.collector.query_profiler import QueryProfiler
+from src.collector.sessions_settings import SessionsSettings
 from src.data.academic_activity import AcademicActivity
 from src.data.activity import Activity
 from src.data.course import Course
 from src.data.course_choice import CourseChoice
 from src.data.degree import Degree
+from src.data.day import Day
 from src.data.language import Language
 from src.data.meeting import Meeting
 from src.data.semester import Semester
@@ -24,24 +33,167 @@ from src.data.user import User
 
 EnglishName = str
 HebrewName = str
+T = TypeVar("T")
+
+# pylint: disable=too-many-lines
 
 
 class Database:
+    # Shared by all the instances, keeps long-lived connections per thread.
+    connection_pool = ConnectionPool()
+    # In-memory copies of shared database files, by their path.
+    shared_snapshots: Dict[str, DatabaseSnapshot] = {}
+    # Small lookup tables of the shared database, kept until the database is changed.
+    lookup_cache = LookupCache()
+    # Parsed personal files and tables, kept until their files are changed (by any process).
+    personal_cache = LookupCache()
+    # Opt-in stats of the queries by the method that ran them.
+    query_profiler = QueryProfiler()
+    # Settings of the web sessions, by the session id.
+    sessions_settings = SessionsSettings()
+
+    # Every item upgrades the schema by one version (saved in 'PRAGMA user_version').
+    SHARED_MIGRATIONS = migrations.SHARED_MIGRATIONS
+    PERSONAL_MIGRATIONS = migrations.PERSONAL_MIGRATIONS
+
+    # The columns of the activities table that build AcademicActivity, by its fields order.
+    ACADEMIC_ACTIVITY_COLUMNS = [
+        "name",
+        "activity_type",
+        "attendance_required",
+        "lecturer_name",
+        "course_number",
+        "parent_course_number",
+        "location",
+        "activity_id",
+        "description",
+        "current_capacity",
+        "max_capacity",
+        "actual_course_number",
+    ]
 
     @contextlib.contextmanager
     def connect(self, database_file: Path) -> Tuple[Connection, Cursor]:
-        connection = None
-        cursor = None
-        try:
-            connection = database.connect(database_file)
-            cursor = connection.cursor()
+        if self.shared_snapshot and database_file == self.shared_database_path:
+            connection_context = self.shared_snapshot.connect()
+        else:
+            # The shared database file is shipped as is, don't change its journal mode.
+            use_wal = database_file == self.personal_database_path
+            connection_context = self.connection_pool.connect(database_file, use_wal)
+        # The caller is the frame above the contextmanager
+        method_name = inspect.currentframe().f_back.f_back.f_code.co_name if self.query_profiler.enabled else ""
+        with connection_context as connection, self.query_profiler.cursor(connection, method_name) as cursor:
             yield connection, cursor
-            connection.commit()
-        finally:
-            if cursor:
-                cursor.close()
-            if connection:
-                connection.close()
+
+    def close_connections(self):
+        self.connection_pool.invalidate(self.shared_database_path)
+        self.connection_pool.invalidate(self.personal_database_path)
+
+    def use_shared_snapshot(self):
+        """
+        Read the shared database from an in-memory copy that is shared by all the instances in the process,
+        used by long-running servers. The shared database becomes read only for this instance.
+        """
+        key = str(self.shared_database_path)
+        if key not in Database.shared_snapshots:
+            Database.shared_snapshots[key] = DatabaseSnapshot(self.shared_database_path)
+        self.shared_snapshot = Database.shared_snapshots[key]
+
+    def get_shared_version(self):
+        """
+        :return: value that is changed when the shared database is changed, used to invalidate the caches.
+        """
+        if self.shared_snapshot:
+            return self.shared_snapshot.signature
+        return get_file_signature(self.shared_database_path)
+
+    def _load_lookup(self, key: Hashable, load: Callable[[], T]) -> T:
+        return Database.lookup_cache.get(self.shared_database_path, self.get_shared_version(), key, load)
+
+    def _load_personal_file(self, path: Path, load: Callable[[], T]) -> T:
+        """
+        :return: a copy of the value loaded from the file, the callers may change it.
+        """
+        return copy.deepcopy(Database.personal_cache.get(path, get_file_signature(path), None, load))
+
+    def _save_personal_file(self, path: Path, value):
+        """
+        Should be called after the value is written to the file, so the next load doesn't read it again.
+        """
+        Database.personal_cache.set(path, get_file_signature(path), None, copy.deepcopy(value))
+
+    def _get_personal_database_version(self):
+        # The personal database is in WAL mode, the commits change the WAL file until its checkpoint.
+        wal_path = self.personal_database_path.with_name(f"{self.personal_database_path.name}-wal")
+        return get_file_signature(self.personal_database_path), get_file_signature(wal_path)
+
+    def use_catalogue(self):
+        """
+        Load the academic activities from the memory-mapped catalogue file instead of the shared database,
+        the file is exported again when the shared database is changed.
+        """
+        self.catalogue_enabled = True
+
+    def export_catalogue(self):
+        with self.connect(self.shared_database_path) as (unused_connection, cursor):
+            Catalogue.export(cursor, self.catalogue_path, self.get_shared_version(),
+                             self._academic_activity_columns_text())
+
+    def _get_catalogue(self) -> Optional[Catalogue]:
+        """
+        Should be called inside a connection to the shared database, so the snapshot version is up to date.
+        :return: the catalogue of the current shared database, None if it isn't used or can't be exported.
+        """
+        version = self.get_shared_version()
+        if not self.catalogue_enabled or not version:
+            return None
+        try:
+            return Catalogue.open(self.catalogue_path, version, self.export_catalogue)
+        except (OSError, ValueError, OperationalError) as error:
+            self.logger.warning("Failed to load the catalogue file, load from the database until it's changed, "
+                                "error: %s", error)
+            return None
+
+    def _invalidate_lookups(self):
+        Database.lookup_cache.invalidate(self.shared_database_path)
+
+    @staticmethod
+    def _academic_activity_columns_text(table_name: str = "activities") -> str:
+        return ", ".join(f"{table_name}.{column}" for column in Database.ACADEMIC_ACTIVITY_COLUMNS)
+
+    def _english_groups_filter(self, settings: Optional[Settings],
+                               table_name: str = "activities") -> Tuple[str, List[int]]:
+        """
+        :return: the condition text and its parameters, filters out the english speakers groups if the settings say so.
+        """
+        if not settings or settings.show_english_speaker_courses:
+            return "1", []
+        groups = [int(group) for group in self.english_groups]
+        column = f"{table_name}.group_number"
+        return f"({column} IS NULL OR {column} NOT IN ({', '.join(['?'] * len(groups))}))", groups
+
+    @contextlib.contextmanager
+    def bulk_write(self, database_file: Path, synchronous_off: bool = False) -> Tuple[Connection, Cursor]:
+        """
+        All the writes to the database file inside this context are done in a single transaction.
+        :param synchronous_off: don't wait for the data to reach the disk, use only for full rebuilds
+        that can be restarted from scratch if the process crashes.
+        """
+        with self.connect(database_file) as (connection, cursor):
+            cursor.execute("PRAGMA synchronous;")
+            synchronous = cursor.fetchone()[0]
+            if synchronous_off:
+                cursor.execute("PRAGMA synchronous = OFF;")
+            try:
+                yield connection, cursor
+                connection.commit()
+            except BaseException:
+                # The safety level can't be changed inside a transaction
+                connection.rollback()
+                raise
+            finally:
+                connection.execute(f"PRAGMA synchronous = {synchronous};")
+                self._invalidate_lookups()
 
     def __init__(self, database_id: Optional[str] = None):
         self.logger = utils.get_logging()
@@ -69,6 +221,7 @@ class Database:
         personal_path.mkdir(parents=True, exist_ok=True)
 
         self.shared_database_path = main_database_path / "database.db"
+        self.catalogue_path = main_database_path / "catalogue.bin"
         self.user_name_file_path = personal_path / "user_data.txt"
         self.years_file_path = personal_path / "years_data.txt"
         self.versions_path = personal_path / "versions.txt"
@@ -76,6 +229,31 @@ class Database:
         self.personal_database_path = personal_path / "personal_database.db"
         self.courses_choose_path = personal_path / "course_choose_user_input.txt"
         self.english_groups = ["10", "20"]
+        self.shared_snapshot: Optional[DatabaseSnapshot] = None
+        self.catalogue_enabled = False
+        # Keep the IN lists under the lowest SQLITE_MAX_VARIABLE_NUMBER of old sqlite builds
+        self.max_query_parameters = 900
+
+    def _load_meetings(self, cursor: Cursor, activities: List[Activity], language: Optional[Language] = None):
+        """
+        Load the meetings of all the activities with IN-batched queries and group them in a single pass.
+        :param language: the language of the academic meetings, None for the personal meetings.
+        """
+        table_name = "meetings" if language else "personal_meetings"
+        language_filter = "AND language_value = ?" if language else ""
+        language_values = (language.short_name(),) if language else ()
+        activities_ids = list({activity.activity_id for activity in activities})
+        meetings_by_activity_id = defaultdict(list)
+        for index in range(0, len(activities_ids), self.max_query_parameters):
+            activities_ids_batch = activities_ids[index:index + self.max_query_parameters]
+            cursor.execute(f"SELECT activity_id, day, start_minutes, end_minutes FROM {table_name} "
+                           f"WHERE activity_id IN ({', '.join(['?'] * len(activities_ids_batch))}) "
+                           f"{language_filter};",
+                           (*activities_ids_batch, *language_values))
+            for activity_id, day, start_minutes, end_minutes in cursor.fetchall():
+                meetings_by_activity_id[activity_id].append(Meeting.from_minutes(day, start_minutes, end_minutes))
+        for activity in activities:
+            activity.meetings = list(meetings_by_activity_id.get(activity.activity_id, []))
 
     def init_personal_database_tables(self):
         self.personal_database_path.parent.mkdir(parents=True, exist_ok=True)
@@ -96,6 +274,7 @@ class Database:
             cursor.execute("CREATE TABLE IF NOT EXISTS activities_tracks "
                            "(activity_id TEXT, track INTEGER, "
                            "PRIMARY KEY (activity_id, track));")
+        self.migrate_personal_database()
 
     def init_shared_database_tables(self):
         self.shared_database_path.parent.mkdir(parents=True, exist_ok=True)
@@ -155,6 +334,50 @@ class Database:
                            "(degree_name TEXT, parent_course_number INTEGER, "
                            "FOREIGN KEY(degree_name) REFERENCES degrees(name), "
                            "PRIMARY KEY(degree_name, parent_course_number));")
+        self.migrate_shared_database()
+        self._invalidate_lookups()
+
+    def _load_schema_version(self, database_path: Path) -> int:
+        with self.connect(database_path) as (unused_connection, cursor):
+            cursor.execute("PRAGMA user_version;")
+            return cursor.fetchone()[0]
+
+    def load_shared_schema_version(self) -> int:
+        return self._load_schema_version(self.shared_database_path)
+
+    def load_personal_schema_version(self) -> int:
+        return self._load_schema_version(self.personal_database_path)
+
+    def _migrate_database(self, database_path: Path, schema_migrations: List[migrations.Migration]):
+        """
+        Apply all the migrations that are newer than the schema version of the database.
+        """
+        with self.connect(database_path) as (unused_connection, cursor):
+            cursor.execute("PRAGMA user_version;")
+            version = cursor.fetchone()[0]
+            for statements in schema_migrations[version:]:
+                for statement in statements:
+                    if callable(statement):
+                        statement(cursor)
+                    else:
+                        cursor.execute(statement)
+            if version < len(schema_migrations):
+                cursor.execute(f"PRAGMA user_version = {len(schema_migrations)};")
+                self.logger.debug("Database %s migrated from version %d to version %d",
+                                  database_path.name, version, len(schema_migrations))
+
+    def migrate_shared_database(self):
+        self._migrate_database(self.shared_database_path, Database.SHARED_MIGRATIONS)
+
+    def migrate_personal_database(self):
+        self._migrate_database(self.personal_database_path, Database.PERSONAL_MIGRATIONS)
+
+    def analyze_shared_database(self):
+        """
+        Collect statistics for the query planner, should run after the shared database is fully written.
+        """
+        with self.connect(self.shared_database_path) as (unused_connection, cursor):
+            cursor.execute("ANALYZE;")
 
     def init_database_tables(self):
         self.init_shared_database_tables()
@@ -165,7 +388,7 @@ class Database:
             cursor.execute("DELETE FROM activities_can_enroll_in;")
             cursor.execute("DELETE FROM activities_tracks;")
 
-    def load_degrees_courses(self) -> Dict[int, Set[Degree]]:
+    def _query_degrees_courses(self) -> Dict[int, Set[Degree]]:
         degrees_courses = defaultdict(set)
         with self.connect(self.shared_database_path) as (unused_connection, cursor):
             cursor.execute("SELECT * FROM degrees_courses;")
@@ -173,43 +396,62 @@ class Database:
                 degrees_courses[course_number].add(Degree[degree_name])
         return degrees_courses
 
-    def load_campus_id(self, campus_name: str):
+    def load_degrees_courses(self) -> Dict[int, Set[Degree]]:
+        degrees_courses = self._load_lookup("degrees_courses", self._query_degrees_courses)
+        return defaultdict(set, {course_number: set(degrees) for course_number, degrees in degrees_courses.items()})
+
+    def _query_campuses_by_names(self) -> Dict[str, Tuple[int, EnglishName, HebrewName]]:
+        campuses_by_names = {}
         with self.connect(self.shared_database_path) as (unused_connection, cursor):
-            cursor.execute("SELECT id FROM campuses WHERE english_name = ? or hebrew_name = ?;",
-                           (campus_name, campus_name))
-            campus_id = cursor.fetchone()[0]
-            return campus_id
+            cursor.execute("SELECT id, english_name, hebrew_name FROM campuses;")
+            for campus in cursor.fetchall():
+                _campus_id, english_name, hebrew_name = campus
+                campuses_by_names.setdefault(english_name, campus)
+                campuses_by_names.setdefault(hebrew_name, campus)
+        return campuses_by_names
+
+    def load_campus_id(self, campus_name: str):
+        campus_id, *_names = self._load_lookup("campuses_by_names", self._query_campuses_by_names)[campus_name]
+        return campus_id
 
     def save_semesters(self, semesters: List[Semester]):
         with self.connect(self.shared_database_path) as (unused_connection, cursor):
-            for semester in semesters:
-                cursor.execute("INSERT OR IGNORE INTO semesters VALUES (?, ?);", (*semester, ))
+            cursor.executemany("INSERT OR IGNORE INTO semesters VALUES (?, ?);",
+                               [(*semester, ) for semester in semesters])
 
     def save_activities_ids_groups_can_enroll_in(self, activities_can_enroll_in: Dict[str, Set[int]]):
-        self.clear_activities_ids_tracks_can_enroll()
         with self.connect(self.personal_database_path) as (unused_connection, cursor):
-            for activity_id, tracks in activities_can_enroll_in.items():
-                cursor.execute("INSERT INTO activities_can_enroll_in VALUES (?);", (activity_id, ))
-                for track in tracks:
-                    cursor.execute("INSERT INTO activities_tracks VALUES (?, ?);", (activity_id, track))
-
-    def load_activities_ids_groups_can_enroll_in(self) -> Dict[str, Set[str]]:
+            self.clear_activities_ids_tracks_can_enroll()
+            cursor.executemany("INSERT INTO activities_can_enroll_in VALUES (?);",
+                               [(activity_id, ) for activity_id in activities_can_enroll_in])
+            cursor.executemany("INSERT INTO activities_tracks VALUES (?, ?);",
+                               [(activity_id, track)
+                                for activity_id, tracks in activities_can_enroll_in.items() for track in tracks])
+
+    def load_activities_ids_groups_can_enroll_in(self) -> Dict[str, Set[int]]:
         if not self.personal_database_path.exists():
             return {}
         with self.connect(self.personal_database_path) as (unused_connection, cursor):
-            cursor.execute("SELECT activity_id FROM activities_can_enroll_in;")
-            activities_can_enroll_in = {activity_id: set() for (activity_id,) in cursor.fetchall()}
-            for activity_id, tracks in activities_can_enroll_in.items():
-                cursor.execute("SELECT track FROM activities_tracks WHERE activity_id = ?;", (activity_id, ))
-                tracks.update(track for (track,) in cursor.fetchall())
-            return activities_can_enroll_in
+            cursor.execute("SELECT activities_can_enroll_in.activity_id, activities_tracks.track "
+                           "FROM activities_can_enroll_in "
+                           "LEFT JOIN activities_tracks "
+                           "ON activities_can_enroll_in.activity_id = activities_tracks.activity_id;")
+            activities_can_enroll_in = defaultdict(set)
+            for activity_id, track in cursor.fetchall():
+                tracks = activities_can_enroll_in[activity_id]
+                if track is not None:
+                    tracks.add(track)
+            return dict(activities_can_enroll_in)
 
     def save_degrees(self, degrees: List[Degree]):
         with self.connect(self.shared_database_path) as (unused_connection, cursor):
-            for degree in degrees:
-                cursor.execute("INSERT OR IGNORE INTO degrees VALUES (?, ?);", (*degree, ))
+            cursor.executemany("INSERT OR IGNORE INTO degrees VALUES (?, ?);", [(*degree, ) for degree in degrees])
+        self._invalidate_lookups()
 
     def load_degrees(self) -> List[Degree]:
+        return list(self._load_lookup("degrees", self._query_degrees))
+
+    def _query_degrees(self) -> List[Degree]:
         if not self.shared_database_path.exists():
             return []
         with self.connect(self.shared_database_path) as (unused_connection, cursor):
@@ -239,12 +481,14 @@ class Database:
 
     def save_personal_activities(self, activities: List[Activity]):
         with self.connect(self.personal_database_path) as (unused_connection, cursor):
-            for activity in activities:
-                cursor.execute("INSERT INTO personal_activities VALUES (?, ?);",
-                               (activity.activity_id, activity.name))
-                for meeting in activity.meetings:
-                    cursor.execute("INSERT OR IGNORE INTO personal_meetings VALUES (?, ?, ?, ?);",
-                                   (activity.activity_id, *meeting, ))
+            cursor.executemany("INSERT INTO personal_activities VALUES (?, ?);",
+                               [(activity.activity_id, activity.name) for activity in activities])
+            cursor.executemany("INSERT OR IGNORE INTO personal_meetings "
+                               "(activity_id, day, start_time, end_time, start_minutes, end_minutes) "
+                               "VALUES (?, ?, ?, ?, ?, ?);",
+                               [(activity.activity_id, *meeting, meeting.get_start_time_in_minutes(),
+                                 meeting.get_end_time_in_minutes())
+                                for activity in activities for meeting in activity.meetings])
 
     def load_courses_choices(self, campus_name: str,
                              language: Language,
@@ -260,35 +504,97 @@ class Database:
         activities_ids = activities_ids or []
         assert extract_unrelated_degrees is bool(settings)
         assert degrees
-        groups = self.english_groups if settings and not settings.show_english_speaker_courses else [".*"]
-        regex_filter_group = re.compile(rf"^\d+\.({'|'.join(groups)})\..*$")
+        if not self.shared_database_path.exists():
+            return {}
+        if not courses and not activities_ids:
+            courses_choices = self.load_materialized_courses_choices(campus_name, language, settings)
+            if courses_choices:
+                return courses_choices
+        return self._query_courses_choices(campus_name, language, courses, activities_ids, settings)
+
+    def _query_courses_choices(self, campus_name: str, language: Language, courses: Optional[List[Course]],
+                               activities_ids: List[str], settings: Optional[Settings]) -> Dict[str, CourseChoice]:
         courses = courses or self.load_active_courses(campus_name, language)
-        courses_choices_data = defaultdict(lambda: (set(), set()))
-        courses_choices = {}
-        lecture_index = 0
-        practice_index = 1
-        parent_ids = {}
+        courses_parent_numbers = [str(course.parent_course_number) for course in courses]
+        activities_ids_text = f"activity_id IN ({', '.join(['?'] * len(activities_ids))})" if activities_ids else "1"
+        lecture_types = [activity_type.value for activity_type in Type if activity_type.is_lecture()]
+        groups_text, groups = self._english_groups_filter(settings)
 
-        activities = self.load_academic_activities(campus_name, language, courses, activities_ids)
+        with self.connect(self.shared_database_path) as (unused_connection, cursor):
+            campus_id = self.load_campus_id(campus_name)
+            cursor.execute("SELECT name, parent_course_number, lecturer_name, "
+                           f"activity_type IN ({', '.join(['?'] * len(lecture_types))}), MIN(rowid), MAX(rowid) "
+                           "FROM activities "
+                           "WHERE campus_id = ? AND language_value = ? AND "
+                           f"parent_course_number IN ({','.join(courses_parent_numbers)}) "
+                           f"AND {activities_ids_text} AND {groups_text} "
+                           "GROUP BY 1, 2, 3, 4 "
+                           "ORDER BY 5;",
+                           (*lecture_types, campus_id, language.short_name(), *activities_ids, *groups))
+            rows = cursor.fetchall()
 
-        for activity in activities:
-            if settings and not settings.show_english_speaker_courses:
-                if regex_filter_group.search(activity.activity_id):
-                    continue
-            index = lecture_index if activity.type.is_lecture() else practice_index
-            courses_choices_data[activity.name][index].add(activity.lecturer_name)
-            parent_ids[activity.name] = activity.parent_course_number
-
-        for activity_name, (lectures, practices) in courses_choices_data.items():
-            course_choice = CourseChoice(
-                activity_name,
-                parent_ids[activity_name],
-                lectures,
-                practices
-            )
-            courses_choices[activity_name] = course_choice
+        courses_choices = {}
+        # The parent course number is taken from the last activity of the course
+        parent_ids_rows = {}
+        for name, parent_course_number, lecturer_name, is_lecture, _first_row, last_row in rows:
+            if name not in courses_choices:
+                courses_choices[name] = CourseChoice(name, parent_course_number, set(), set())
+            course_choice = courses_choices[name]
+            if is_lecture:
+                course_choice.available_teachers_for_lecture.add(lecturer_name)
+            else:
+                course_choice.available_teachers_for_practice.add(lecturer_name)
+            if last_row > parent_ids_rows.get(name, -1):
+                parent_ids_rows[name] = last_row
+                course_choice.parent_course_number = parent_course_number
         return courses_choices
 
+    def materialize_courses_choices(self):
+        """
+        Save the course choices of all the active courses for every campus, language and english speakers groups
+        setting, should run after all the courses and activities are saved.
+        The active courses are loaded by load_active_courses with the default degrees, its degrees join has no join
+        condition, so they are all the courses with activities in the campus (if the default degrees have courses).
+        That's why the choices are saved once for all the degrees.
+        """
+        with self.connect(self.shared_database_path) as (unused_connection, cursor):
+            cursor.execute("DELETE FROM courses_choices;")
+            for language in Language:
+                for campus_id, (english_name, _hebrew_name) in self.load_campuses().items():
+                    for show_english_speaker_courses in [True, False]:
+                        settings = Settings()
+                        settings.show_english_speaker_courses = show_english_speaker_courses
+                        courses_choices = self._query_courses_choices(english_name, language, None, [], settings)
+                        cursor.executemany(
+                            "INSERT INTO courses_choices VALUES (?, ?, ?, ?, ?, ?, ?, ?);",
+                            [(campus_id, language.short_name(), show_english_speaker_courses, position,
+                              course_choice.name, course_choice.parent_course_number,
+                              json.dumps(sorted(course_choice.available_teachers_for_lecture), ensure_ascii=False),
+                              json.dumps(sorted(course_choice.available_teachers_for_practice), ensure_ascii=False))
+                             for position, course_choice in enumerate(courses_choices.values())])
+
+    def load_materialized_courses_choices(self, campus_name: str, language: Language,
+                                          settings: Optional[Settings] = None) -> Dict[str, CourseChoice]:
+        """
+        :return: the saved course choices of all the active courses, empty if they weren't materialized.
+        """
+        if not self.shared_database_path.exists():
+            return {}
+        show_english_speaker_courses = not settings or settings.show_english_speaker_courses
+        with self.connect(self.shared_database_path) as (unused_connection, cursor):
+            campus_id = self.load_campus_id(campus_name)
+            try:
+                cursor.execute("SELECT name, parent_course_number, lecture_lecturers, practice_lecturers "
+                               "FROM courses_choices "
+                               "WHERE campus_id = ? AND language_value = ? AND show_english_speaker_courses = ? "
+                               "ORDER BY position;",
+                               (campus_id, language.short_name(), show_english_speaker_courses))
+            except OperationalError:
+                return {}
+            return {name: CourseChoice(name, parent_course_number, set(json.loads(lecture_lecturers)),
+                                       set(json.loads(practice_lecturers)))
+                    for name, parent_course_number, lecture_lecturers, practice_lecturers in cursor.fetchall()}
+
     def load_personal_activities(self) -> List[Activity]:
         if not self.personal_database_path.exists():
             return []
@@ -296,28 +602,25 @@ class Database:
             cursor.execute("SELECT id, name FROM personal_activities;")
             activities = [Activity.create_personal_from_database(activity_id, activity_name)
                           for activity_id, activity_name in cursor.fetchall()]
-
-            for activity in activities:
-                cursor.execute("SELECT * FROM personal_meetings "
-                               "WHERE activity_id = ?;", (activity.activity_id, ))
-                meetings = [Meeting(*data_line) for _activity_id, *data_line in cursor.fetchall()]
-                activity.meetings = meetings
+            self._load_meetings(cursor, activities)
             return activities
 
     def save_courses(self, courses: List[Course], language: Language):
         with self.connect(self.shared_database_path) as (unused_connection, cursor):
-            for course in courses:
-                cursor.execute("INSERT OR IGNORE INTO courses VALUES (?, ?, ?, ?, ?, ?);",
-                               (*course, language.short_name(), course.is_active, course.credits_count))
-                for semester in course.semesters:
-                    cursor.execute("INSERT OR IGNORE INTO semesters_courses VALUES (?, ?);",
-                                   (semester.value, course.parent_course_number))
-                for degree in course.degrees:
-                    cursor.execute("INSERT OR IGNORE INTO degrees_courses VALUES (?, ?);",
-                                   (degree.name, course.parent_course_number))
-                for degree in course.mandatory_degrees:
-                    cursor.execute("INSERT OR IGNORE INTO mandatory_courses VALUES (?, ?);",
-                                   (degree.name, course.parent_course_number))
+            cursor.execute("DELETE FROM courses_choices;")
+            cursor.executemany("INSERT OR IGNORE INTO courses VALUES (?, ?, ?, ?, ?, ?);",
+                               [(*course, language.short_name(), course.is_active, course.credits_count)
+                                for course in courses])
+            cursor.executemany("INSERT OR IGNORE INTO semesters_courses VALUES (?, ?);",
+                               [(semester.value, course.parent_course_number)
+                                for course in courses for semester in course.semesters])
+            cursor.executemany("INSERT OR IGNORE INTO degrees_courses VALUES (?, ?);",
+                               [(degree.name, course.parent_course_number)
+                                for course in courses for degree in course.degrees])
+            cursor.executemany("INSERT OR IGNORE INTO mandatory_courses VALUES (?, ?);",
+                               [(degree.name, course.parent_course_number)
+                                for course in courses for degree in course.mandatory_degrees])
+        self._invalidate_lookups()
 
     def load_courses_active_numbers(self) -> Set[str]:
         if not self.shared_database_path.exists():
@@ -329,44 +632,82 @@ class Database:
     def load_courses(self, language: Language, degrees: Optional[Set[Degree]] = None) -> List[Course]:
         if not self.shared_database_path.exists():
             return []
-        courses_numbers_active = self.load_courses_active_numbers()
         with self.connect(self.shared_database_path) as (unused_connection, cursor):
             degrees = degrees or Degree.get_defaults()
-            degrees_text = f"({', '.join(['?'] * len(degrees))})"
-            cursor.execute("SELECT courses.* "
+            degrees_names = [degree.name for degree in degrees]
+            parents_query = "SELECT parent_course_number FROM degrees_courses " \
+                            f"WHERE degree_name IN ({', '.join(['?'] * len(degrees))})"
+            cursor.execute("SELECT name, course_number, parent_course_number, is_active, credits, "
+                           "course_number IN (SELECT course_number FROM activities) "
                            "FROM courses "
-                           "INNER JOIN degrees_courses "
-                           "ON courses.parent_course_number = degrees_courses.parent_course_number "
-                           "WHERE courses.language_value = ? "
-                           f"AND degrees_courses.degree_name in {degrees_text};",
-                           (language.short_name(), *[degree.name for degree in degrees]))
-            courses = {Course(name, course_number, parent_course_number,
-                              is_active=bool(is_active), credits_count=credits_count)
-                       for name, course_number, parent_course_number, unused_langauge, is_active, credits_count
+                           f"WHERE language_value = ? AND parent_course_number IN ({parents_query});",
+                           (language.short_name(), *degrees_names))
+            courses = {parent_course_number: Course(name, course_number, parent_course_number,
+                                                    is_active=bool(is_active or has_activities),
+                                                    credits_count=credits_count)
+                       for name, course_number, parent_course_number, is_active, credits_count, has_activities
                        in cursor.fetchall()}
-            for course in courses:
-                cursor.execute("SELECT name FROM semesters "
-                               "INNER JOIN semesters_courses "
-                               "INNER JOIN degrees_courses "
-                               "ON semesters.id = semesters_courses.semester_id "
-                               "AND semesters_courses.course_id = degrees_courses.parent_course_number "
-                               "WHERE semesters_courses.course_id = ?"
-                               f"AND degrees_courses.degree_name in {degrees_text};",
-                               (course.parent_course_number, *[degree.name for degree in degrees]))
-                course.semesters = {Semester[semester_name.upper()] for (semester_name,) in cursor.fetchall()}
-            for course in courses:
-                cursor.execute("SELECT degree_name FROM degrees_courses "
-                               "WHERE parent_course_number = ?;",
-                               (course.parent_course_number,))
-                course.degrees = {Degree[degree_name.upper()] for (degree_name,) in cursor.fetchall()}
-            for course in courses:
-                cursor.execute("SELECT degree_name FROM mandatory_courses "
-                               "WHERE parent_course_number = ?;",
-                               (course.parent_course_number,))
-                course.mandatory_degrees = {Degree[degree_name.upper()] for (degree_name,) in cursor.fetchall()}
-            for course in courses:
-                course.is_active = course.course_number in courses_numbers_active or course.is_active
-            return list(courses)
+
+            cursor.execute("SELECT semesters_courses.course_id, semesters.name FROM semesters_courses "
+                           "INNER JOIN semesters ON semesters.id = semesters_courses.semester_id "
+                           f"WHERE semesters_courses.course_id IN ({parents_query});",
+                           degrees_names)
+            for parent_course_number, semester_name in cursor.fetchall():
+                if parent_course_number in courses:
+                    courses[parent_course_number].semesters.add(Semester[semester_name.upper()])
+
+            degrees_tables = [("degrees_courses", "degrees"), ("mandatory_courses", "mandatory_degrees")]
+            for table_name, attribute_name in degrees_tables:
+                cursor.execute(f"SELECT parent_course_number, degree_name FROM {table_name} "
+                               f"WHERE parent_course_number IN ({parents_query});",
+                               degrees_names)
+                for parent_course_number, degree_name in cursor.fetchall():
+                    if parent_course_number in courses:
+                        getattr(courses[parent_course_number], attribute_name).add(Degree[degree_name.upper()])
+            return list(courses.values())
+
+    def index_courses_search(self):
+        """
+        Rebuild the search index of the courses names, should run after all the courses are saved.
+        """
+        with self.connect(self.shared_database_path) as (unused_connection, cursor):
+            migrations.index_courses_search(cursor)
+
+    def search_courses(self, prefix: str, campus_name: Optional[str], degrees: Collection[Degree], limit: int = 10,
+                       language: Optional[Language] = None) -> List[str]:
+        """
+        Find the courses whose name or one of its aliases has words that start with the words of the prefix.
+        :param campus_name: only courses with activities in this campus, None for all the campuses.
+        :return: the names of the courses, the best matches first.
+        """
+        words = prefix.split()
+        if not words or not self.shared_database_path.exists():
+            return []
+        language = language or Language.get_current()
+        degrees = degrees or Degree.get_defaults()
+        with self.connect(self.shared_database_path) as (unused_connection, cursor):
+            filters = "parent_course_number IN (SELECT parent_course_number FROM degrees_courses " \
+                      f"WHERE degree_name IN ({', '.join(['?'] * len(degrees))}))"
+            parameters = [degree.name for degree in degrees]
+            if campus_name:
+                filters += " AND parent_course_number IN (SELECT parent_course_number FROM activities " \
+                           "WHERE campus_id = ? AND language_value = ?)"
+                parameters += [self.load_campus_id(campus_name), language.short_name()]
+            # Every word is a quoted prefix, so the user's text isn't parsed as a query syntax.
+            # The texts that start with the prefix are first.
+            match_text = " ".join('"' + word.replace('"', '""') + '"*' for word in words)
+            try:
+                cursor.execute("SELECT name FROM courses_search "
+                               f"WHERE courses_search MATCH ? AND language_value = ? AND {filters} "
+                               "GROUP BY name ORDER BY MAX(text LIKE ?) DESC, MIN(rank), name LIMIT ?;",
+                               (match_text, language.short_name(), *parameters, f"{prefix.strip()}%", limit))
+            except OperationalError:
+                # Without the search index
+                cursor.execute("SELECT name FROM courses "
+                               f"WHERE name LIKE ? AND language_value = ? AND {filters} "
+                               "ORDER BY name LIMIT ?;",
+                               (f"%{'%'.join(words)}%", language.short_name(), *parameters, limit))
+            return [name for (name,) in cursor.fetchall()]
 
     def load_active_courses(self, campus_name: str, language: Language,
                             degrees: Collection[Degree] = None) -> List[Course]:
@@ -398,29 +739,29 @@ class Database:
         with self.connect(self.shared_database_path) as (unused_connection, cursor):
             campus_id = self.load_campus_id(campus_name)
             degrees = degrees or Degree.get_defaults()
+            catalogue = self._get_catalogue()
+            if catalogue:
+                degrees_courses = self.load_degrees_courses()
+                parent_courses_numbers = {number for number in parent_courses_numbers
+                                          if degrees_courses.get(number, set()) & set(degrees)}
+                excluded_groups = self._english_groups_filter(settings)[1]
+                return catalogue.load_activities(campus_id, language.short_name(), parent_courses_numbers,
+                                                 excluded_groups=excluded_groups)
             degrees_text = f"({', '.join(['?'] * len(degrees))})"
             parent_courses_numbers_text = f"({', '.join(['?'] * len(parent_courses_numbers))})"
-            cursor.execute("SELECT DISTINCT activities.* FROM activities "
+            groups_text, groups = self._english_groups_filter(settings)
+            cursor.execute(f"SELECT DISTINCT {self._academic_activity_columns_text()} FROM activities "
                            "INNER JOIN degrees_courses "
                            "ON activities.parent_course_number = degrees_courses.parent_course_number "
                            "WHERE activities.campus_id = ? AND activities.language_value = ? "
                            f"AND degrees_courses.degree_name in {degrees_text} "
-                           f"AND activities.parent_course_number in {parent_courses_numbers_text};",
+                           f"AND activities.parent_course_number in {parent_courses_numbers_text} "
+                           f"AND {groups_text};",
                            (campus_id, language.short_name(), *[degree.name for degree in degrees],
-                            *parent_courses_numbers))
-            activities = [AcademicActivity(*data_line) for *data_line, _campus_id, _language_value in cursor.fetchall()]
-
-            if settings and not settings.show_english_speaker_courses:
-                regex = re.compile(rf"^\d+\.({'|'.join(self.english_groups)})\..*$")
-                activities = list(filter(lambda activity_obj: not regex.search(activity_obj.activity_id), activities))
-
-            for activity in activities:
-                cursor.execute("SELECT * FROM meetings "
-                               "WHERE activity_id = ? AND "
-                               "language_value = ?;",
-                               (activity.activity_id, language.short_name()))
-                meetings = [Meeting(*data_line) for _activity_id, *data_line, _language_value in cursor.fetchall()]
-                activity.meetings = meetings
+                            *parent_courses_numbers, *groups))
+            activities = [AcademicActivity(*data_line) for data_line in cursor.fetchall()]
+
+            self._load_meetings(cursor, activities, language)
             return activities
 
     def load_activities_by_courses_choices(self, courses_choices: Dict[str, CourseChoice],
@@ -447,7 +788,7 @@ class Database:
 
                 text_hold_place_practices = f"lecturer_name IN ({hold_place_practices})" if practices else is_not_null
 
-                cursor.execute("SELECT * FROM activities "
+                cursor.execute(f"SELECT {self._academic_activity_columns_text()} FROM activities "
                                f"WHERE name = ? AND {activities_ids_text} AND language_value = ? AND campus_id = ? AND "
                                f"((activity_type in (?, ?) AND {text_hold_place_lectures}) "
                                "OR "
@@ -456,35 +797,39 @@ class Database:
                                 *lecture_types, *lectures,
                                 *practice_types, *practices))
 
-                activities = [AcademicActivity(*data_line) for *data_line, _campus_id, _language in cursor.fetchall()]
+                activities = [AcademicActivity(*data_line) for data_line in cursor.fetchall()]
 
                 for activity in activities:
                     if activity.type.is_lecture():
                         activity.attendance_required = course_choice.attendance_required_for_lecture
                     else:
                         activity.attendance_required = course_choice.attendance_required_for_practice
-                    cursor.execute("SELECT * FROM meetings "
-                                   "WHERE activity_id = ? AND language_value = ?;",
-                                   (activity.activity_id, language.short_name()))
-                    meetings = [Meeting(*data_line) for _activity_id, *data_line, _language_value in cursor.fetchall()]
-                    activity.meetings = meetings
 
                 activities_result.extend(activities)
+            self._load_meetings(cursor, activities_result, language)
         return activities_result
 
     def save_academic_activities(self, activities: List[AcademicActivity], campus_name: str, language: Language):
         with self.connect(self.shared_database_path) as (unused_connection, cursor):
             campus_id = self.load_campus_id(campus_name)
-            for activity in activities:
-                cursor.execute("INSERT OR IGNORE INTO lecturers VALUES (?);", (activity.lecturer_name,))
-                cursor.execute("INSERT OR IGNORE INTO activities VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?);",
-                               (*activity, campus_id, language.short_name()))
-                cursor.execute("INSERT OR IGNORE INTO courses_lecturers VALUES (?, ?, ?, ?, ?, ?);",
-                               (activity.course_number, activity.parent_course_number, activity.lecturer_name,
-                                activity.type.is_lecture(), campus_id, language.short_name()))
-                for meeting in activity.meetings:
-                    cursor.execute("INSERT OR IGNORE INTO meetings VALUES (?, ?, ?, ?, ?);",
-                                   (activity.activity_id, *meeting, language.short_name()))
+            language_value = language.short_name()
+            cursor.execute("DELETE FROM courses_choices;")
+            cursor.executemany("INSERT OR IGNORE INTO lecturers VALUES (?);",
+                               [(activity.lecturer_name,) for activity in activities])
+            columns = [*Database.ACADEMIC_ACTIVITY_COLUMNS, "campus_id", "language_value", "group_number", "week_slots"]
+            cursor.executemany(f"INSERT OR IGNORE INTO activities ({', '.join(columns)}) "
+                               f"VALUES ({', '.join(['?'] * len(columns))});",
+                               [(*activity, campus_id, language_value, activity.get_group_number(),
+                                 activity.get_week_slots()) for activity in activities])
+            cursor.executemany("INSERT OR IGNORE INTO courses_lecturers VALUES (?, ?, ?, ?, ?, ?);",
+                               [(activity.course_number, activity.parent_course_number, activity.lecturer_name,
+                                 activity.type.is_lecture(), campus_id, language_value) for activity in activities])
+            cursor.executemany("INSERT OR IGNORE INTO meetings "
+                               "(activity_id, day, start_time, end_time, language_value, start_minutes, end_minutes) "
+                               "VALUES (?, ?, ?, ?, ?, ?, ?);",
+                               [(activity.activity_id, *meeting, language_value, meeting.get_start_time_in_minutes(),
+                                 meeting.get_end_time_in_minutes())
+                                for activity in activities for meeting in activity.meetings])
 
     def load_academic_activities(self, campus_name: str, language: Language,
                                  courses: List[Course], activities_ids: List[str] = None) -> List[AcademicActivity]:
@@ -495,29 +840,50 @@ class Database:
             activities_ids_text = f"activities.activity_id IN ({', '.join(['?'] * len(activities_ids))})" \
                 if activities_ids else "1"
             campus_id = self.load_campus_id(campus_name)
+            catalogue = self._get_catalogue()
+            if catalogue:
+                return catalogue.load_activities(campus_id, language.short_name(),
+                                                 {course.parent_course_number for course in courses},
+                                                 activities_ids or None)
             courses_parent_numbers = [str(course.parent_course_number) for course in courses]
-            cursor.execute("SELECT * FROM activities "
+            cursor.execute(f"SELECT {self._academic_activity_columns_text()} FROM activities "
                            "WHERE campus_id = ? AND language_value = ? AND "
                            f"parent_course_number IN ({','.join(courses_parent_numbers)}) "
                            f"AND {activities_ids_text} ;",
                            (campus_id, language.short_name(), *activities_ids))
 
-            activities = [AcademicActivity(*data_line) for *data_line, _campus_id, _language in cursor.fetchall()]
+            activities = [AcademicActivity(*data_line) for data_line in cursor.fetchall()]
+            self._load_meetings(cursor, activities, language)
+            return activities
 
-            for activity in activities:
-                cursor.execute("SELECT * FROM meetings "
-                               "WHERE activity_id = ? AND "
-                               "language_value = ?;",
-                               (activity.activity_id, language.short_name()))
-                meetings = [Meeting(*data_line) for _activity_id, *data_line, _language_value in cursor.fetchall()]
-                activity.meetings = meetings
+    def load_activities_in_time_range(self, campus_name: str, language: Language, day: Day,
+                                      start_minutes: int, end_minutes: int) -> List[AcademicActivity]:
+        """
+        :return: the activities that have a meeting in the day which overlaps the time range, with all their meetings.
+        :param start_minutes: the start of the range in minutes from midnight.
+        :param end_minutes: the end of the range in minutes from midnight.
+        """
+        if not self.shared_database_path.exists():
+            return []
+        with self.connect(self.shared_database_path) as (unused_connection, cursor):
+            campus_id = self.load_campus_id(campus_name)
+            # The range predicates on the minutes are answered by meetings_day_minutes_index
+            cursor.execute(f"SELECT {self._academic_activity_columns_text()} FROM activities "
+                           "WHERE campus_id = ? AND language_value = ? AND activity_id IN "
+                           "(SELECT activity_id FROM meetings WHERE language_value = ? AND day = ? "
+                           "AND start_minutes < ? AND end_minutes > ?);",
+                           (campus_id, language.short_name(), language.short_name(), day.value,
+                            end_minutes, start_minutes))
+            activities = [AcademicActivity(*data_line) for data_line in cursor.fetchall()]
+            self._load_meetings(cursor, activities, language)
             return activities
 
     def save_campuses(self, campuses: Dict[int, Tuple[EnglishName, HebrewName]]):
         with self.connect(self.shared_database_path) as (unused_connection, cursor):
-            for campus_id, (english_name, hebrew_name) in campuses.items():
-                cursor.execute("INSERT OR IGNORE INTO campuses VALUES (?, ?, ?);",
-                               (campus_id, english_name, hebrew_name))
+            cursor.executemany("INSERT OR IGNORE INTO campuses VALUES (?, ?, ?);",
+                               [(campus_id, english_name, hebrew_name)
+                                for campus_id, (english_name, hebrew_name) in campuses.items()])
+        self._invalidate_lookups()
 
     def load_campus_names(self, language: Language = None) -> List[str]:
         if not self.shared_database_path.exists():
@@ -535,6 +901,9 @@ class Database:
     def load_campuses(self) -> Dict[int, Tuple[EnglishName, HebrewName]]:
         if not self.shared_database_path.exists():
             return {}
+        return dict(self._load_lookup("campuses", self._query_campuses))
+
+    def _query_campuses(self) -> Dict[int, Tuple[EnglishName, HebrewName]]:
         with self.connect(self.shared_database_path) as (unused_connection, cursor):
             cursor.execute("SELECT * FROM campuses;")
             campuses = {campus_id: (english_name, hebrew_name)
@@ -542,6 +911,9 @@ class Database:
         return campuses
 
     def load_current_versions(self) -> Tuple[Optional[str], Optional[str]]:
+        return self._load_personal_file(self.versions_path, self._read_current_versions)
+
+    def _read_current_versions(self) -> Tuple[Optional[str], Optional[str]]:
         if not self.versions_path.is_file():
             return None, None
         with open(self.versions_path, "r", encoding=utils.ENCODING) as file:
@@ -551,6 +923,7 @@ class Database:
     def save_current_versions(self, software_version: str, database_version: str):
         with open(self.versions_path, "w", encoding=utils.ENCODING) as file:
             file.write(f"{software_version}\n{database_version}")
+        self._save_personal_file(self.versions_path, (software_version.strip(), database_version.strip()))
 
     def get_language(self) -> Optional[Language]:
         settings = self.load_settings()
@@ -564,8 +937,13 @@ class Database:
     def save_courses_console_choose(self, courses_names: List[str]):
         with open(self.courses_choose_path, "w", encoding=utils.ENCODING) as file:
             file.write("\n".join(courses_names))
+        # The cached value is the one that is read back, the names may contain new lines.
+        Database.personal_cache.invalidate(self.courses_choose_path)
 
     def load_courses_console_choose(self) -> Optional[List[str]]:
+        return self._load_personal_file(self.courses_choose_path, self._read_courses_console_choose)
+
+    def _read_courses_console_choose(self) -> Optional[List[str]]:
         if not self.courses_choose_path.is_file():
             return None
         with open(self.courses_choose_path, "r", encoding=utils.ENCODING) as file:
@@ -580,6 +958,9 @@ class Database:
         password
         :return: The user data or None if not found.
         """
+        return self._load_personal_file(self.user_name_file_path, self._read_user_data)
+
+    def _read_user_data(self) -> Optional[User]:
         if not self.user_name_file_path.exists():
             return None
         with open(self.user_name_file_path, "r", encoding=utils.ENCODING) as file:
@@ -589,6 +970,7 @@ class Database:
         self.versions_path.unlink(missing_ok=True)
 
     def clear_all_data(self):
+        self.close_connections()
         self.clear_all_personal_folders()
         self.clear_settings()
         self.clear_years()
@@ -601,18 +983,32 @@ class Database:
         for folder in all_folders:
             shutil.rmtree(folder, ignore_errors=True)
 
-    def save_settings(self, settings: Settings):
+    def save_settings(self, settings: Settings, session_id: Optional[str] = None):
+        """
+        :param session_id: keep the settings in memory for this web session instead of the settings file.
+        """
+        if session_id:
+            Database.sessions_settings.set(session_id, settings)
+            return
         with open(self.settings_file_path, "w", encoding=utils.ENCODING) as file:
             file.write(settings.to_json(indent=4, ensure_ascii=False, sort_keys=False))
+        self._save_personal_file(self.settings_file_path, settings)
 
-    def load_settings(self) -> Optional[Settings]:
+    def load_settings(self, session_id: Optional[str] = None) -> Optional[Settings]:
+        if session_id:
+            return Database.sessions_settings.get(session_id)
+        return self._load_personal_file(self.settings_file_path, self._read_settings)
+
+    def _read_settings(self) -> Optional[Settings]:
         if not self.settings_file_path.exists():
             return None
         with open(self.settings_file_path, "r", encoding=utils.ENCODING) as file:
-            # pylint: disable=no-member
             return Settings.from_json(file.read())
 
-    def clear_settings(self):
+    def clear_settings(self, session_id: Optional[str] = None):
+        if session_id:
+            Database.sessions_settings.remove(session_id)
+            return
         self.settings_file_path.unlink(missing_ok=True)
 
     def get_common_campuses_names(self) -> List[str]:
@@ -625,21 +1021,21 @@ class Database:
         return campus_names
 
     def translate_campus_name(self, campus_name: str) -> str:
-        with self.connect(self.shared_database_path) as (unused_connection, cursor):
-            cursor.execute("SELECT english_name, hebrew_name FROM campuses WHERE hebrew_name = ? or english_name = ?;",
-                           (campus_name, campus_name))
-            result = cursor.fetchone()
-            if Language.get_current() is Language.HEBREW:
-                campus_name = result[1]
-            else:
-                campus_name = result[0]
-        return campus_name
+        _campus_id, english_name, hebrew_name = \
+            self._load_lookup("campuses_by_names", self._query_campuses_by_names)[campus_name]
+        if Language.get_current() is Language.HEBREW:
+            return hebrew_name
+        return english_name
 
     def save_years(self, years: Dict[int, str]):
         with open(self.years_file_path, "w", encoding=utils.ENCODING) as file:
             file.write(json.dumps(years))
+        self._save_personal_file(self.years_file_path, {int(key): value for key, value in years.items()})
+
+    def load_years(self) -> Dict[int, str]:
+        return self._load_personal_file(self.years_file_path, self._read_years)
 
-    def load_years(self):
+    def _read_years(self) -> Dict[int, str]:
         if not self.years_file_path.exists():
             return {}
         with open(self.years_file_path, "r", encoding=utils.ENCODING) as file:
@@ -653,11 +1049,64 @@ class Database:
         if user_data:
             with open(self.user_name_file_path, "w", encoding=utils.ENCODING) as file:
                 file.write(f"{user_data.username}\n{user_data.password}")
+            self._save_personal_file(self.user_name_file_path, User(user_data.username.strip(),
+                                                                    user_data.password.strip()))
 
     def update_database(self, database_path: Path):
-        self.clear_shared_database()
-        self.init_database_tables()
-        shutil.copy2(database_path, self.shared_database_path)
+        """
+        Replace the shared database with the given database file without downtime.
+        The file is copied next to the shared database, migrated and validated there, and then renamed over it.
+        Readers always see the old or the new database, other processes reopen their connections, snapshots,
+        lookups and catalogues when they see the file was replaced.
+        """
+        self.shared_database_path.parent.mkdir(parents=True, exist_ok=True)
+        suffix = f".{os.getpid()}.tmp"
+        new_database = copy.copy(self)
+        new_database.shared_database_path = self.shared_database_path.with_name(self.shared_database_path.name + suffix)
+        new_database.shared_snapshot = None
+        try:
+            shutil.copy2(database_path, new_database.shared_database_path)
+            # The given database may be created by an older version
+            new_database.init_shared_database_tables()
+            new_database.validate_shared_database()
+            # Exported before the swap, the signature of the file doesn't change when it's renamed.
+            if Catalogue.get_paths(self.catalogue_path):
+                new_database.export_catalogue()
+            # Open files can't be replaced on Windows
+            self.connection_pool.invalidate(new_database.shared_database_path)
+            self.close_connections()
+            os.replace(new_database.shared_database_path, self.shared_database_path)
+        finally:
+            self.connection_pool.invalidate(new_database.shared_database_path)
+            new_database.shared_database_path.unlink(missing_ok=True)
+        self.close_connections()
+        self._invalidate_lookups()
+        if self.shared_snapshot:
+            self.shared_snapshot.reload()
+        self.init_personal_database_tables()
+
+    def validate_shared_database(self):
+        """
+        :raise ValueError: if the shared database is corrupted, missing tables or has an unknown schema version.
+        """
+        with self.connect(self.shared_database_path) as (unused_connection, cursor):
+            cursor.execute("PRAGMA quick_check;")
+            result = cursor.fetchall()
+        if result != [("ok",)]:
+            raise ValueError(f"The database {self.shared_database_path} is corrupted: {result}")
+        if not self.are_shared_tables_exists():
+            raise ValueError(f"The database {self.shared_database_path} is missing tables")
+        self.check_shared_schema_version()
+
+    def check_shared_schema_version(self):
+        """
+        The shared database is migrated by the update script and shipped migrated, the entry points only check it.
+        :raise ValueError: if the shared database has a schema version different from the one of the code.
+        """
+        version = self.load_shared_schema_version()
+        if version != len(Database.SHARED_MIGRATIONS):
+            raise ValueError(f"The database {self.shared_database_path} has the schema version {version} "
+                             f"instead of {len(Database.SHARED_MIGRATIONS)}")
 
     def _are_tables_exists(self, tables_names: List[str], database_path: Path):
         if not database_path.exists():
@@ -683,21 +1132,36 @@ class Database:
                 cursor.execute(f"DROP TABLE IF EXISTS {table_name};")
 
     def clear_shared_database(self):
-        self._clear_database(self._shared_sql_tables, self.shared_database_path)
+        self._clear_database([*self._shared_sql_tables, "courses_choices", "courses_search"], self.shared_database_path)
+        if self.shared_database_path.exists():
+            # The tables are created again from the first version
+            with self.connect(self.shared_database_path) as (unused_connection, cursor):
+                cursor.execute("PRAGMA user_version = 0;")
+        self._invalidate_lookups()
 
     def clear_personal_database(self):
+        Database.personal_cache.invalidate(self.personal_database_path)
         self._clear_database(self._personal_sql_tables, self.personal_database_path)
+        if self.personal_database_path.exists():
+            with self.connect(self.personal_database_path) as (unused_connection, cursor):
+                cursor.execute("PRAGMA user_version = 0;")
 
     def clear_last_courses_choose_input(self):
         self.courses_choose_path.unlink(missing_ok=True)
 
     def save_courses_already_done(self, courses: Set[Course]):
         with self.connect(self.personal_database_path) as (unused_connection, cursor):
-            for course in courses:
-                cursor.execute("INSERT OR IGNORE INTO courses_already_done (parent_course_number) VALUES (?);",
-                               (course.parent_course_number,))
+            cursor.executemany("INSERT OR IGNORE INTO courses_already_done (parent_course_number) VALUES (?);",
+                               [(course.parent_course_number,) for course in courses])
+        Database.personal_cache.invalidate(self.personal_database_path)
 
     def load_courses_already_done(self, language: Language) -> Set[Course]:
+        version = (self._get_personal_database_version(), self.get_shared_version())
+        courses = Database.personal_cache.get(self.personal_database_path, version, ("courses_already_done", language),
+                                              lambda: self._query_courses_already_done(language))
+        return copy.deepcopy(courses)
+
+    def _query_courses_already_done(self, language: Language) -> Set[Course]:
         if not self.personal_database_path.exists():
             return set()
         with self.connect(self.personal_database_path) as (unused_connection, cursor):
@@ -719,3 +1183,4 @@ class Database:
     def clear_courses_already_done(self):
         with self.connect(self.personal_database_path) as (unused_connection, cursor):
             cursor.execute("DELETE FROM courses_already_done;")
+        Database.personal_cache.invalidate(self.personal_database_path)
@@ -0,0 +1,49 @@
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class LookupCache:
+    """
+    Values loaded from small lookup tables of database files, kept until the database version is changed.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values: Dict[str, Tuple[Hashable, Dict[Hashable, Any]]] = {}
+
+    def _get_values(self, database_file: Path, version: Hashable) -> Dict[Hashable, Any]:
+        path = str(database_file)
+        cached_version, values = self._values.get(path, (None, None))
+        if values is None or cached_version != version:
+            values = {}
+            self._values[path] = (version, values)
+        return values
+
+    def get(self, database_file: Path, version: Hashable, key: Hashable, load: Callable[[], T]) -> T:
+        """
+        :param version: any value that is changed when the database file is changed.
+        :param load: called to load the value if it isn't cached for this version.
+        """
+        with self._lock:
+            values = self._get_values(database_file, version)
+            if key in values:
+                return values[key]
+        value = load()
+        with self._lock:
+            # After invalidate() the values dict is replaced, so a stale value is never kept.
+            values[key] = value
+        return value
+
+    def set(self, database_file: Path, version: Hashable, key: Hashable, value: Any):
+        """
+        Cache a value that was just written to the database file, with the version of the file after the write.
+        """
+        with self._lock:
+            self._get_values(database_file, version)[key] = value
+
+    def invalidate(self, database_file: Path):
+        with self._lock:
+            self._values.pop(str(database_file), None)
@@ -0,0 +1,152 @@
+import json
+from collections import defaultdict
+from pathlib import Path
+from sqlite3 import Cursor, OperationalError
+from typing import Callable, Dict, List, Optional, Union
+
+from src.data.academic_activity import AcademicActivity
+from src.data.meeting import Meeting
+
+# SQL statements and functions that upgrade a database schema by one version.
+Migration = List[Union[str, Callable[[Cursor], None]]]
+
+COURSES_ALIASES_PATH = Path(__file__).parent.parent / "algorithms" / "constraint.json"
+
+
+def _add_column_if_not_exists(cursor: Cursor, table_name: str, column_name: str, column_type: str):
+    cursor.execute(f"PRAGMA table_info({table_name});")
+    # Schema changes aren't part of the transaction, the column may be added by a migration that didn't finish.
+    if column_name not in {name for _index, name, *_rest in cursor.fetchall()}:
+        cursor.execute(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column_type};")
+
+
+def _add_meetings_minutes(table_name: str) -> Callable[[Cursor], None]:
+    def add_meetings_minutes(cursor: Cursor):
+        _add_column_if_not_exists(cursor, table_name, "start_minutes", "INTEGER")
+        _add_column_if_not_exists(cursor, table_name, "end_minutes", "INTEGER")
+        # The times are saved as "HH:MM"
+        cursor.execute(f"UPDATE {table_name} SET "
+                       "start_minutes = CAST(substr(start_time, 1, instr(start_time, ':') - 1) AS INTEGER) * 60 + "
+                       "CAST(substr(start_time, instr(start_time, ':') + 1) AS INTEGER), "
+                       "end_minutes = CAST(substr(end_time, 1, instr(end_time, ':') - 1) AS INTEGER) * 60 + "
+                       "CAST(substr(end_time, instr(end_time, ':') + 1) AS INTEGER);")
+    return add_meetings_minutes
+
+
+def _add_activities_week_slots(cursor: Cursor):
+    _add_column_if_not_exists(cursor, "activities", "week_slots", "INTEGER")
+    week_slots = defaultdict(int)
+    cursor.execute("SELECT activity_id, language_value, day, start_minutes, end_minutes FROM meetings;")
+    for activity_id, language_value, day, start_minutes, end_minutes in cursor.fetchall():
+        week_slots[(activity_id, language_value)] |= Meeting.week_slots(day, start_minutes, end_minutes)
+    cursor.execute("UPDATE activities SET week_slots = 0;")
+    cursor.executemany("UPDATE activities SET week_slots = ? WHERE activity_id = ? AND language_value = ?;",
+                       [(slots, activity_id, language_value)
+                        for (activity_id, language_value), slots in week_slots.items()])
+
+
+def _add_activities_groups_numbers(cursor: Cursor):
+    _add_column_if_not_exists(cursor, "activities", "group_number", "INTEGER")
+    cursor.execute("SELECT rowid, activity_id FROM activities;")
+    cursor.executemany("UPDATE activities SET group_number = ? WHERE rowid = ?;",
+                       [(AcademicActivity.parse_group_number(activity_id), rowid)
+                        for rowid, activity_id in cursor.fetchall()])
+
+
+def load_courses_aliases(file_path: Path = COURSES_ALIASES_PATH) -> Dict[int, List[str]]:
+    """
+    :return: the aliases of the courses by their course number, from the courses constraints file.
+    """
+    if not file_path.exists():
+        return {}
+    with open(file_path, "r", encoding="utf-8") as json_file:
+        courses = json.load(json_file)["courses"]
+    return {course["course_number"]: course.get("aliases", []) for course in courses
+            if not course.get("deprecated", False)}
+
+
+def index_courses_search(cursor: Cursor, courses_aliases: Optional[Dict[int, List[str]]] = None):
+    """
+    Rebuild the full-text index of the courses names and their aliases, skipped if sqlite is built without FTS5.
+    Every row is a searchable text and the name of the course it belongs to.
+    """
+    try:
+        cursor.execute("CREATE VIRTUAL TABLE IF NOT EXISTS courses_search USING fts5("
+                       "text, name UNINDEXED, parent_course_number UNINDEXED, language_value UNINDEXED, "
+                       "prefix='1 2 3');")
+    except OperationalError:
+        return
+    courses_aliases = load_courses_aliases() if courses_aliases is None else courses_aliases
+    cursor.execute("DELETE FROM courses_search;")
+    cursor.execute("SELECT name, course_number, parent_course_number, language_value FROM courses;")
+    cursor.executemany("INSERT INTO courses_search VALUES (?, ?, ?, ?);",
+                       [(text, name, parent_course_number, language_value)
+                        for name, course_number, parent_course_number, language_value in cursor.fetchall()
+                        for text in [name, *courses_aliases.get(course_number, [])]])
+
+
+# Every item upgrades the shared schema by one version.
+SHARED_MIGRATIONS: List[Migration] = [
+    # Version 1: covering indexes for the hot lookup paths.
+    [
+        "CREATE INDEX IF NOT EXISTS activities_campus_language_parent_index "
+        "ON activities (campus_id, language_value, parent_course_number, activity_id);",
+        "CREATE INDEX IF NOT EXISTS activities_name_index "
+        "ON activities (name, campus_id, language_value);",
+        "CREATE INDEX IF NOT EXISTS activities_course_number_index ON activities (course_number);",
+        "CREATE INDEX IF NOT EXISTS meetings_activity_language_index "
+        "ON meetings (activity_id, language_value, day, start_time, end_time);",
+        "CREATE INDEX IF NOT EXISTS degrees_courses_parent_index "
+        "ON degrees_courses (parent_course_number, degree_name);",
+        "CREATE INDEX IF NOT EXISTS mandatory_courses_parent_index "
+        "ON mandatory_courses (parent_course_number, degree_name);",
+        "CREATE INDEX IF NOT EXISTS semesters_courses_course_index ON semesters_courses (course_id, semester_id);",
+    ],
+    # Version 2: the group number of the activity, parsed from its id.
+    [
+        _add_activities_groups_numbers,
+        "CREATE INDEX IF NOT EXISTS activities_group_number_index "
+        "ON activities (campus_id, language_value, group_number);",
+    ],
+    # Version 3: the course choices of all the active courses, built once the database is fully written.
+    [
+        "CREATE TABLE IF NOT EXISTS courses_choices "
+        "(campus_id INTEGER, language_value CHARACTER(2), degrees TEXT, show_english_speaker_courses BOOLEAN, "
+        "position INTEGER, name TEXT, parent_course_number INTEGER, is_active BOOLEAN, "
+        "lecture_lecturers TEXT, practice_lecturers TEXT, "
+        "FOREIGN KEY(campus_id) REFERENCES campuses(id), "
+        "PRIMARY KEY(campus_id, language_value, degrees, show_english_speaker_courses, position));",
+    ],
+    # Version 4: the meetings times in minutes from midnight and the week slots of every activity.
+    [
+        _add_meetings_minutes("meetings"),
+        "DROP INDEX IF EXISTS meetings_activity_language_index;",
+        "CREATE INDEX IF NOT EXISTS meetings_activity_language_minutes_index "
+        "ON meetings (activity_id, language_value, day, start_minutes, end_minutes);",
+        "CREATE INDEX IF NOT EXISTS meetings_day_minutes_index "
+        "ON meetings (language_value, day, start_minutes, end_minutes);",
+        _add_activities_week_slots,
+    ],
+    # Version 5: full-text index of the courses names and aliases.
+    [
+        index_courses_search,
+    ],
+    # Version 6: the course choices don't depend on the degrees, saved once per campus and language.
+    [
+        "DROP TABLE IF EXISTS courses_choices;",
+        "CREATE TABLE IF NOT EXISTS courses_choices "
+        "(campus_id INTEGER, language_value CHARACTER(2), show_english_speaker_courses BOOLEAN, "
+        "position INTEGER, name TEXT, parent_course_number INTEGER, "
+        "lecture_lecturers TEXT, practice_lecturers TEXT, "
+        "FOREIGN KEY(campus_id) REFERENCES campuses(id), "
+        "PRIMARY KEY(campus_id, language_value, show_english_speaker_courses, position));",
+    ],
+]
+
+# Every item upgrades the personal schema by one version.
+PERSONAL_MIGRATIONS: List[Migration] = [
+    # Version 1: the meetings times in minutes from midnight.
+    [
+        _add_meetings_minutes("personal_meetings"),
+    ],
+]
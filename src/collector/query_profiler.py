@@ -0,0 +1,180 @@
+import contextlib
+import threading
+import time
+from dataclasses import dataclass
+from sqlite3 import Connection, Cursor
+from typing import Callable, Dict, Iterator, List, Optional
+
+from src import utils
+
+
+@dataclass
+class QueriesStats:
+    queries_count: int = 0
+    rows_count: int = 0
+    seconds: float = 0.0
+
+
+class ProfiledCursor(Cursor):
+    """
+    Cursor that reports the time of its statements and the rows it fetched to the query profiler.
+    """
+
+    profiler: "QueryProfiler"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._start_statement("")
+
+    def execute(self, sql, parameters=()):
+        self._start_statement(sql)
+        return self._measure(super().execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        self._start_statement(sql)
+        return self._measure(super().executemany, sql, seq_of_parameters)
+
+    def fetchone(self):
+        row = self._measure(super().fetchone)
+        self.profiler.record(rows_count=int(row is not None))
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self._measure(super().fetchmany, self.arraysize if size is None else size)
+        self.profiler.record(rows_count=len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = self._measure(super().fetchall)
+        self.profiler.record(rows_count=len(rows))
+        return rows
+
+    def _start_statement(self, sql: str):
+        self._sql = sql
+        self._statement_seconds = 0.0
+        self._is_slow_logged = False
+
+    def _measure(self, function: Callable, *args):
+        start = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            seconds = time.perf_counter() - start
+            self.profiler.record(seconds=seconds)
+            # The statement runs while its rows are fetched, so the fetch time is part of it.
+            self._statement_seconds += seconds
+            if self._statement_seconds >= self.profiler.slow_query_seconds and not self._is_slow_logged:
+                self._is_slow_logged = True
+                self.profiler.log_slow_query(self._sql, self._statement_seconds)
+
+
+class QueryProfiler:
+    """
+    Opt-in instrumentation of the database queries, counts the statements, the rows fetched and the time
+    by the Database method that ran them, and logs the slow queries.
+    The statements are counted by the sqlite trace callback, so every statement that sqlite runs is included.
+    """
+
+    SLOW_QUERY_SECONDS = 0.05
+
+    def __init__(self):
+        self.enabled = False
+        self.slow_query_seconds = QueryProfiler.SLOW_QUERY_SECONDS
+        self.logger = utils.get_logging()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._stats: Dict[str, QueriesStats] = {}
+
+    def enable(self, slow_query_seconds: Optional[float] = None):
+        if slow_query_seconds is not None:
+            self.slow_query_seconds = slow_query_seconds
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def _get_methods_names(self) -> List[str]:
+        if not hasattr(self._local, "methods_names"):
+            self._local.methods_names = []
+        return self._local.methods_names
+
+    @contextlib.contextmanager
+    def cursor(self, connection: Connection, method_name: str) -> Iterator[Cursor]:
+        """
+        :param method_name: the Database method that uses the cursor, nested calls are counted by the innermost one.
+        """
+        if not self.enabled:
+            cursor = connection.cursor()
+            try:
+                yield cursor
+            finally:
+                cursor.close()
+            return
+
+        methods_names = self._get_methods_names()
+        methods_names.append(method_name)
+        connection.set_trace_callback(self._trace)
+        cursor = connection.cursor(ProfiledCursor)
+        cursor.profiler = self
+        try:
+            yield cursor
+        finally:
+            cursor.close()
+            methods_names.pop()
+
+    def _trace(self, unused_statement: str):
+        if self.enabled:
+            self.record(queries_count=1)
+
+    def record(self, queries_count: int = 0, rows_count: int = 0, seconds: float = 0.0):
+        methods_names = self._get_methods_names()
+        method_name = methods_names[-1] if methods_names else "unknown"
+        scope = getattr(self._local, "scope", None)
+        with self._lock:
+            for stats_by_method in [self._stats, scope] if scope is not None else [self._stats]:
+                stats = stats_by_method.setdefault(method_name, QueriesStats())
+                stats.queries_count += queries_count
+                stats.rows_count += rows_count
+                stats.seconds += seconds
+
+    def log_slow_query(self, sql: str, seconds: float):
+        methods_names = self._get_methods_names()
+        method_name = methods_names[-1] if methods_names else "unknown"
+        self.logger.warning("Slow query in %s took %.3f seconds: %s", method_name, seconds, " ".join(sql.split()))
+
+    def start_scope(self):
+        """
+        Collect the stats of the current thread separately too, for example for a single web request.
+        """
+        self._local.scope = {}
+
+    def end_scope(self) -> Dict[str, QueriesStats]:
+        scope = getattr(self._local, "scope", None) or {}
+        self._local.scope = None
+        return scope
+
+    def get_stats(self) -> Dict[str, QueriesStats]:
+        with self._lock:
+            return {method_name: QueriesStats(**vars(stats)) for method_name, stats in self._stats.items()}
+
+    def reset(self):
+        with self._lock:
+            self._stats = {}
+
+    @staticmethod
+    def get_summary(stats_by_method: Dict[str, QueriesStats]) -> str:
+        lines = [f"{'Method':<45} {'Queries':>8} {'Rows':>9} {'Seconds':>9}"]
+        for method_name, stats in sorted(stats_by_method.items(), key=lambda item: item[1].seconds, reverse=True):
+            lines.append(f"{method_name:<45} {stats.queries_count:>8} {stats.rows_count:>9} {stats.seconds:>9.4f}")
+        total = QueriesStats(sum(stats.queries_count for stats in stats_by_method.values()),
+                             sum(stats.rows_count for stats in stats_by_method.values()),
+                             sum(stats.seconds for stats in stats_by_method.values()))
+        lines.append(f"{'Total':<45} {total.queries_count:>8} {total.rows_count:>9} {total.seconds:>9.4f}")
+        return "\n".join(lines)
+
+    def log_summary(self, title: str = "Database queries", stats_by_method: Optional[Dict[str, QueriesStats]] = None):
+        """
+        :param stats_by_method: the default is the stats of the whole process.
+        """
+        stats_by_method = self.get_stats() if stats_by_method is None else stats_by_method
+        self.logger.info("%s summary:\n%s", title, self.get_summary(stats_by_method))
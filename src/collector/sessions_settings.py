@@ -0,0 +1,42 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from src.data.settings import Settings
+
+
+class SessionsSettings:
+    """
+    Settings of the web sessions kept in memory by the session id, instead of the single settings file.
+    Every session gets its own copy, the least recently used sessions are dropped.
+    The settings are kept encoded, decoding them is faster than a deep copy.
+    They are kept in the memory of the process, so the workers of a multi-process server don't share them,
+    the web app should run in a single process (with threads) or with sticky sessions.
+    """
+
+    MAX_SESSIONS = 10_000
+
+    def __init__(self, max_sessions: int = MAX_SESSIONS):
+        self.max_sessions = max_sessions
+        self._lock = threading.Lock()
+        self._settings: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    def get(self, session_id: str) -> Optional[Settings]:
+        with self._lock:
+            data = self._settings.get(session_id)
+            if data is None:
+                return None
+            self._settings.move_to_end(session_id)
+        return Settings.from_dict(data)
+
+    def set(self, session_id: str, settings: Settings):
+        data = settings.to_dict()
+        with self._lock:
+            self._settings[session_id] = data
+            self._settings.move_to_end(session_id)
+            while len(self._settings) > self.max_sessions:
+                self._settings.popitem(last=False)
+
+    def remove(self, session_id: str):
+        with self._lock:
+            self._settings.pop(session_id, None)
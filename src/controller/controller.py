@@ -12,7 +12,7 @@ from src import utils
 from src.algorithms.csp import CSP, Status
 from src.algorithms.constraint_courses import ConstraintCourses
 from src.collector.network import Network, InvalidSemesterTimeRequestException
-from src.collector.db import Database
+from src.collector.catalogue_service import CatalogueService
 from src.convertor.convertor import Convertor
 from src.data.academic_activity import AcademicActivity
 from src.data.course_choice import CourseChoice
@@ -30,8 +30,9 @@ Lecture = str
 
 
 class Controller:
-    def __init__(self, verbose: bool = False):
-        self.database = Database()
+    def __init__(self, verbose: bool = False, catalogue: Optional[CatalogueService] = None):
+        self.catalogue = catalogue or CatalogueService()
+        self.database = self.catalogue.database
         self.convertor = Convertor()
         self.csp = CSP()
         self.network = Network()
@@ -178,10 +179,10 @@ class Controller:
         schedules_by_learning_days = defaultdict(list)
         schedules_by_standby_time = defaultdict(list)
 
+        file_name_template = _("with_{}_learning_days_and_{}_minutes_study_time")
         for schedule in all_schedules:
-            standby_in_minutes = schedule.get_standby_in_minutes()
-            learning_days = schedule.get_learning_days()
-            file_name_template = _("with_{}_learning_days_and_{}_minutes_study_time")
+            standby_in_minutes = schedule.metrics.standby_in_minutes
+            learning_days = schedule.metrics.learning_days
             schedule.file_name += file_name_template.format(len(learning_days), standby_in_minutes)
             schedules_by_learning_days[len(learning_days)].append(schedule)
             schedules_by_standby_time[standby_in_minutes].append(schedule)
@@ -242,6 +243,16 @@ class Controller:
             msg += "'python main.py -- database_path {path_to_database.db}'"
             self._print(msg)
             sys.exit(0)
+        try:
+            self.database.check_shared_schema_version()
+        except ValueError as error:
+            self.logger.error("ERROR: %s, can't continue.", error)
+            msg = _("The database is outdated, can't continue, please download the database file from the github "
+                    "server and import the database by running :")
+            msg += "'python main.py -- database_path {path_to_database.db}'"
+            self._print(msg)
+            sys.exit(1)
+        self.database.init_personal_database_tables()
 
     def _console_ask_campus_name(self):
         self._clear_screen()
@@ -811,7 +822,7 @@ class Controller:
     def _console_edit_courses_already_done(self, settings: Settings):
         self._clear_screen()
         courses_already_done = self.database.load_courses_already_done(Language.get_current())
-        all_courses = self.database.load_courses(Language.get_current(), settings.degrees)
+        all_courses = self.catalogue.load_courses(Language.get_current(), settings.degrees)
         finish_successfully = False
         message = "Do you want to add all courses from the start? (otherwise add to the exists list)"
         if courses_already_done:
@@ -882,7 +893,7 @@ class Controller:
                 courses_choices.pop(course.name)
 
         if settings.show_only_courses_with_prerequisite_done and courses_already_done:
-            constraint_courses = ConstraintCourses()
+            constraint_courses = ConstraintCourses(self.catalogue)
             courses_cant_do = constraint_courses.get_courses_cant_do()
             for _course_name, course_parent_number in courses_cant_do:
                 for course_choice in courses_choices.values():
@@ -1,4 +1,5 @@
-from typing import List, Union, Dict
+import re
+from typing import List, Union, Dict, Optional, Tuple
 
 from src.data.activity import Activity
 from src.data.course import Course
@@ -10,6 +11,8 @@ class AcademicActivity(Activity):
 
     UNLIMITED_CAPACITY = 10000000
     DEFAULT_ACTUAL_COURSE_NUMBER = -1
+    # For example 120701.10.5785.01 -> 10
+    GROUP_NUMBER_PATTERN = re.compile(r"^\d+\.(\d+)\.")
 
     def __init__(self, name: str = None, activity_type: Union[Type, int] = None, attendance_required: bool = None,
                  lecturer_name: str = None, course_number: int = None, parent_course_number: int = None,
@@ -40,13 +43,21 @@ class AcademicActivity(Activity):
     def is_have_free_places(self) -> bool:
         return self.current_capacity < self.max_capacity
 
-    def __eq__(self, other):
-        is_equals = super().__eq__(other)
-        is_equals = is_equals and self.lecturer_name == other.lecturer_name
-        is_equals = is_equals and self.course_number == other.course_number
-        is_equals = is_equals and self.parent_course_number == other.parent_course_number
-        is_equals = is_equals and self.location == other.location
-        return is_equals
+    def get_group_number(self) -> Optional[int]:
+        return AcademicActivity.parse_group_number(self.activity_id)
+
+    @staticmethod
+    def parse_group_number(activity_id: Optional[str]) -> Optional[int]:
+        match = AcademicActivity.GROUP_NUMBER_PATTERN.search(activity_id) if activity_id else None
+        return int(match.group(1)) if match else None
+
+    @property
+    def key(self) -> Tuple:
+        """
+        The key of the activity with the id of the group in the database and the details of the course.
+        """
+        return (*super().key, self.activity_id, self.lecturer_name, self.course_number, self.parent_course_number,
+                self.location)
 
     def __str__(self):
         return self.name
@@ -54,9 +65,6 @@ class AcademicActivity(Activity):
     def __repr__(self):
         return str(self)
 
-    def __hash__(self):
-        return hash((self.name, self.course_number, self.parent_course_number, self.activity_id))
-
     def same_as_course(self, course: Course):
         is_same = self.name == course.name
         is_same = is_same and self.course_number == course.course_number
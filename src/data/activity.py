@@ -1,7 +1,8 @@
 from collections import defaultdict
-from typing import Dict, List
+from typing import Dict, List, Tuple
 from itertools import count
 
+from src.data.meeting import Meeting
 from src.data.type import Type
 
 
@@ -13,8 +14,30 @@ class Activity:
         self.name = name
         self.type = activity_type or Type.PERSONAL
         self.attendance_required = attendance_required if attendance_required is not None else True
+        self._meetings_key = None
         self.meetings = []
 
+    @property
+    def meetings(self) -> List[Meeting]:
+        return self._meetings
+
+    @meetings.setter
+    def meetings(self, meetings: List[Meeting]):
+        self._meetings = meetings
+        self._meetings_key = None
+
+    @property
+    def key(self) -> Tuple:
+        """
+        Canonical content key of the activity, used for hash and equality.
+        The id isn't part of it, the ids of the activities that aren't saved in the database are only a counter.
+        The meetings part is computed once and kept until the meetings are changed.
+        """
+        if self._meetings_key is None:
+            self._meetings_key = tuple(sorted((meeting.day.value, meeting.get_start_time_in_minutes(),
+                                               meeting.get_end_time_in_minutes()) for meeting in self._meetings))
+        return self.name, self.type.value, self.attendance_required, self._meetings_key
+
     @staticmethod
     def create_personal_from_database(activity_id: int, name: str):
         activity = Activity()
@@ -28,6 +51,7 @@ class Activity:
         if meeting.is_crash_with_meetings(self.meetings):
             raise RuntimeError("Meeting is crash with other meeting")
         self.meetings.append(meeting)
+        self._meetings_key = None
 
     def is_free_slot(self, meeting):
         return not meeting.is_crash_with_meetings(self.meetings)
@@ -49,8 +73,14 @@ class Activity:
     def no_meetings(self):
         return not self.meetings
 
+    def get_week_slots(self) -> int:
+        week_slots = 0
+        for meeting in self.meetings:
+            week_slots |= meeting.get_week_slots()
+        return week_slots
+
     def __hash__(self):
-        return hash(self.name)
+        return hash(self.key)
 
     @staticmethod
     def get_activities_by_name(activities) -> Dict[str, List]:
@@ -78,11 +108,7 @@ class Activity:
         return all_options
 
     def __eq__(self, other):
-        is_equals = self.name == other.name and self.type == other.type
-        is_equals = is_equals and self.attendance_required == other.attendance_required
-        is_equals = is_equals and len(self.meetings) == len(other.meetings)
-        is_equals = is_equals and all(meeting in other.meetings for meeting in self.meetings)
-        return is_equals
+        return self.key == other.key
 
     def __str__(self):
         return self.name
@@ -3,9 +3,9 @@ from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Dict, List, Optional
 from collections import OrderedDict
-from copy import deepcopy
+from copy import copy, deepcopy
 
-from src.collector.db import Database
+from src.collector.catalogue_service import CatalogueService
 from src.data.course import Course
 from src.data.degree import Degree
 from src.data.language import Language
@@ -97,14 +97,14 @@ class CourseConstraint:
         with open(file_path, 'w', encoding='utf-8', newline='\n') as json_file:
             json.dump(json_data, json_file, ensure_ascii=False, sort_keys=False, indent=4)
 
-    def extract_courses_data(self, file_path: Path) -> Dict[int, ConstraintCourseData]:
+    def extract_courses_data(self, file_path: Path,
+                             catalogue: Optional[CatalogueService] = None) -> Dict[int, ConstraintCourseData]:
         assert file_path.exists(), "File does not exist"
         all_courses_ids = set()
         all_ids = set()
         courses = OrderedDict()
-        db = Database()
-        all_courses_objects = db.load_courses(Language.HEBREW, set(Degree))
-        all_courses_objects = {course.course_number: course for course in all_courses_objects}
+        catalogue = catalogue or CatalogueService()
+        all_courses_objects = catalogue.get_view(Language.HEBREW, set(Degree)).courses_by_number
 
         def get_pre_request_courses_list(json_object: Dict, key: str) -> List[PrerequisiteCourse]:
             prerequisite_courses = []
@@ -132,7 +132,8 @@ class CourseConstraint:
             assert course_number > 0, "ERROR: Course id must be positive, edit the 'course_number' key in the file."
             default_course_data = Course("", course_number, 0)
             has_course_info = course_number in all_courses_objects
-            course_info = all_courses_objects.get(course_number, default_course_data)
+            # The courses of the catalogue are shared, change a copy
+            course_info = copy(all_courses_objects.get(course_number, default_course_data))
             default_is_active = course_info.is_active if has_course_info else None
             default_credits_count = course_info.credits_count if has_course_info else None
 
@@ -1,4 +1,4 @@
-from typing import Union
+from typing import Dict, Union
 from time import struct_time, strptime
 import time
 import functools
@@ -7,6 +7,13 @@ from src.data.day import Day
 
 @functools.total_ordering
 class Meeting:
+    # The week is split to slots of 2 hours from 06:00 (earlier times are in the first slot), 9 slots per day.
+    WEEK_SLOTS_START_IN_MINUTES = 6 * 60
+    WEEK_SLOT_IN_MINUTES = 2 * 60
+    WEEK_SLOTS_PER_DAY = 9
+
+    # Same struct_time objects that strptime returns, by minutes from midnight.
+    _times_by_minutes: Dict[int, struct_time] = {}
 
     def __init__(self, day: Union[Day, int], start_time: Union[struct_time, str], end_time: Union[struct_time, str]):
         if isinstance(day, int):
@@ -49,6 +56,43 @@ class Meeting:
     def get_string_end_time(self):
         return time.strftime("%H:%M", self.end_time)
 
+    def get_start_time_in_minutes(self) -> int:
+        return self.start_time.tm_hour * 60 + self.start_time.tm_min
+
+    def get_end_time_in_minutes(self) -> int:
+        return self.end_time.tm_hour * 60 + self.end_time.tm_min
+
+    def get_week_slots(self) -> int:
+        return Meeting.week_slots(self.day, self.get_start_time_in_minutes(), self.get_end_time_in_minutes())
+
+    @staticmethod
+    def week_slots(day: Union[Day, int], start_minutes: int, end_minutes: int) -> int:
+        """
+        :return: bitmask of the week slots the meeting time touches, bit (day - 1) * WEEK_SLOTS_PER_DAY + slot.
+        """
+        first_slot = max(start_minutes - Meeting.WEEK_SLOTS_START_IN_MINUTES, 0) // Meeting.WEEK_SLOT_IN_MINUTES
+        last_slot = max(end_minutes - 1 - Meeting.WEEK_SLOTS_START_IN_MINUTES, 0) // Meeting.WEEK_SLOT_IN_MINUTES
+        last_slot = min(last_slot, Meeting.WEEK_SLOTS_PER_DAY - 1)
+        day_slots = (1 << (last_slot + 1)) - (1 << first_slot)
+        return day_slots << ((int(day) - 1) * Meeting.WEEK_SLOTS_PER_DAY)
+
+    @staticmethod
+    def minutes_to_time(minutes: int) -> struct_time:
+        """
+        :param minutes: minutes from midnight, for example 780 for 13:00
+        :return: struct_time, same as str_to_time returns for the same time
+        """
+        time_value = Meeting._times_by_minutes.get(minutes)
+        if time_value is None:
+            hours, minutes_in_hour = divmod(minutes, 60)
+            time_value = struct_time((1900, 1, 1, hours, minutes_in_hour, 0, 0, 1, -1))
+            Meeting._times_by_minutes[minutes] = time_value
+        return time_value
+
+    @staticmethod
+    def from_minutes(day: Union[Day, int], start_minutes: int, end_minutes: int) -> "Meeting":
+        return Meeting(day, Meeting.minutes_to_time(start_minutes), Meeting.minutes_to_time(end_minutes))
+
     def __eq__(self, other):
         is_equals = self.day == other.day
         is_equals = is_equals and self.start_time == other.start_time
@@ -1,17 +1,147 @@
-from typing import List, Set
-import time
+from dataclasses import dataclass
+from typing import List, Set, Optional, Tuple, Dict, FrozenSet
 from src.data.activity import Activity
 from src.data.day import Day
 from src.data.meeting import Meeting
+from src.data.translation import _
+
+OptionsTable = Tuple[List[List[Activity]], ...]
+
+
+@dataclass(frozen=True)
+class ScheduleMetrics:
+    learning_days: FrozenSet[Day]
+    standby_in_minutes: int
+    # Only academic meetings are counted, times are in minutes from midnight
+    first_start_by_day: Dict[Day, int]
+    last_end_by_day: Dict[Day, int]
+    academic_meetings: Tuple[Meeting, ...]
+    academic_meetings_by_day: Dict[Day, FrozenSet[Meeting]]
+
+    # Don't calculate standby minutes for the break between classes
+    MAX_BREAK_IN_MINUTES = 15
+
+    @staticmethod
+    def create(activities: List[Activity]) -> "ScheduleMetrics":
+        learning_days = frozenset(meeting.day for activity in activities for meeting in activity.meetings)
+        academic_meetings = tuple(meeting for activity in activities for meeting in activity.meetings
+                                  if not activity.type.is_personal())
+        meetings_by_day = {}
+        for meeting in academic_meetings:
+            meetings_by_day.setdefault(meeting.day, []).append(meeting)
+
+        standby_in_minutes = 0
+        first_start_by_day = {}
+        last_end_by_day = {}
+        for day, meetings in meetings_by_day.items():
+            times = sorted((meeting.get_start_time_in_minutes(), meeting.get_end_time_in_minutes())
+                           for meeting in meetings)
+            first_start_by_day[day] = times[0][0]
+            last_end_by_day[day] = max(end_time for _start_time, end_time in times)
+            for (_start_time, end_time), (next_start_time, _next_end_time) in zip(times, times[1:]):
+                delta_time = next_start_time - end_time
+                if delta_time > ScheduleMetrics.MAX_BREAK_IN_MINUTES:
+                    standby_in_minutes += delta_time
+
+        return ScheduleMetrics(
+            learning_days=learning_days,
+            standby_in_minutes=standby_in_minutes,
+            first_start_by_day=first_start_by_day,
+            last_end_by_day=last_end_by_day,
+            academic_meetings=academic_meetings,
+            academic_meetings_by_day={day: frozenset(meetings) for day, meetings in meetings_by_day.items()},
+        )
 
 
 class Schedule:
+    __slots__ = ("_name", "_file_name", "description", "_activities", "option_number", "options_indexes",
+                 "options_table", "_metrics", "_key")
 
-    def __init__(self, name: str, file_name: str, description: str, activities: List[Activity]):
-        self.name = name
-        self.file_name = file_name
+    def __init__(self, name: Optional[str], file_name: Optional[str], description: str,
+                 activities: Optional[List[Activity]]):
+        self._name = name
+        self._file_name = file_name
         self.description = description
-        self.activities = activities
+        self._activities = None if activities is None else list(activities)
+        self.option_number = None
+        self.options_indexes = None
+        self.options_table = None
+        self._metrics = None
+        self._key = None
+
+    @classmethod
+    def from_options(cls, option_number: int, options_indexes: Tuple[int, ...], options_table: OptionsTable):
+        """
+        Create a compact schedule, holds only the selected option index for every course,
+        the activities, name and file name are materialised only when asked for.
+        :param option_number: the number of the schedule, used for the name and the file name
+        :param options_indexes: the index of the selected option for every course in the options table
+        :param options_table: the options of every course, shared between all the schedules of the same problem
+        """
+        schedule = cls(None, None, "", None)
+        schedule.option_number = option_number
+        schedule.options_indexes = options_indexes
+        schedule.options_table = options_table
+        return schedule
+
+    @property
+    def name(self) -> str:
+        if self._name is None:
+            return f"{_('Option')} {self.option_number}"
+        return self._name
+
+    @name.setter
+    def name(self, name: str):
+        self._name = name
+
+    @property
+    def file_name(self) -> str:
+        if self._file_name is None:
+            return f"{_('option')}_{self.option_number}"
+        return self._file_name
+
+    @file_name.setter
+    def file_name(self, file_name: str):
+        self._file_name = file_name
+
+    def _get_activities(self) -> List[Activity]:
+        if self._activities is None:
+            self._activities = [activity for options, index in zip(self.options_table, self.options_indexes)
+                                for activity in options[index]]
+        return self._activities
+
+    @property
+    def activities(self) -> List[Activity]:
+        """
+        :return: a copy of the activities, the metrics and the key are cached so the activities are changed
+        only by setting them.
+        """
+        return list(self._get_activities())
+
+    @activities.setter
+    def activities(self, activities: List[Activity]):
+        self._activities = list(activities)
+        self._metrics = None
+        self._key = None
+
+    @property
+    def key(self) -> Tuple[Tuple, ...]:
+        """
+        Canonical content key of the schedule, the sorted keys of all its activities.
+        """
+        if self._key is None:
+            # The keys mix None with text and numbers in the same fields, so they are sorted by their text
+            self._key = tuple(sorted((activity.key for activity in self._get_activities()), key=repr))
+        return self._key
+
+    @property
+    def metrics(self) -> ScheduleMetrics:
+        """
+        The metrics are computed once and cached, setting new activities invalidates them.
+        """
+        if self._metrics is None:
+            self._metrics = ScheduleMetrics.create(self._get_activities())
+        return self._metrics
 
     def __str__(self):
         return f"{self.name}"
@@ -20,47 +150,31 @@ class Schedule:
         return str(self)
 
     def __eq__(self, other):
-        is_equals = len(self.activities) == len(other.activities)
-        return is_equals and all(activity in other.activities for activity in self.activities)
+        return self.key == other.key
 
     def __hash__(self):
-        return hash(self.file_name)
+        return hash(self.key)
 
     def __contains__(self, activity):
-        return activity in self.activities
+        return activity.key in self.key
 
     def contains(self, activities):
         return all(activity in self for activity in activities)
 
     def get_learning_days(self) -> Set[Day]:
-        return {meeting.day for activity in self.activities for meeting in activity.meetings}
+        return set(self.metrics.learning_days)
 
     def get_all_academic_meetings(self) -> List[Meeting]:
-        return [meeting for activity in self.activities for meeting in activity.meetings
-                if not activity.type.is_personal()]
+        return list(self.metrics.academic_meetings)
 
-    def get_standby_in_minutes(self) -> float:
+    def get_standby_in_minutes(self) -> int:
         """
         Get standby hours for all academic activities in schedule in minutes.
         """
-        result = 0
-        meetings = self.get_all_academic_meetings()
-        meetings.sort()
-
-        def to_minutes(struct_time: time.struct_time):
-            return struct_time.tm_hour * 60 + struct_time.tm_min
-
-        for i in range(len(meetings) - 1):
-            if meetings[i].day != meetings[i + 1].day:
-                continue
-            delta_time = to_minutes(meetings[i + 1].start_time) - to_minutes(meetings[i].end_time)
-            # Don't calculate standby minutes for the break between classes
-            if delta_time > 15:
-                result += delta_time
-        return result
+        return self.metrics.standby_in_minutes
 
     def get_all_meetings_by_day(self, day: Day) -> Set[Meeting]:
-        return {meeting for meeting in self.get_all_academic_meetings() if meeting.day is day}
+        return set(self.metrics.academic_meetings_by_day.get(day, frozenset()))
 
     def __copy__(self):
-        return Schedule(self.name, self.file_name, self.description, self.activities.copy())
+        return Schedule(self.name, self.file_name, self.description, self.activities)
@@ -1,6 +1,6 @@
-from typing import List, Set
-from dataclasses import dataclass, field
-from dataclasses_json import dataclass_json
+import json
+from typing import Any, ClassVar, Dict, List, Set
+from dataclasses import dataclass, field, fields
 
 from src.data.day import Day
 from src.data.degree import Degree
@@ -10,7 +10,6 @@ from src.data.language import Language
 from src import utils
 
 
-@dataclass_json
 @dataclass
 class Settings:
     attendance_required_all_courses: bool = True
@@ -32,6 +31,10 @@ class Settings:
     force_update_data: bool = True
     show_english_speaker_courses: bool = False
 
+    # Saved with the settings, should be increased when the saved format is changed.
+    # The settings without it were saved by dataclasses_json in the format of version 1.
+    SCHEMA_VERSION: ClassVar[int] = 1
+
     @property
     def degrees(self) -> Set[Degree]:
         return {Degree[degree] for degree in self._degrees}
@@ -47,3 +50,59 @@ class Settings:
     @degree.setter
     def degree(self, degree: Degree):
         self._degree = degree.name
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        :return: the settings as json values, the enums are saved by their values.
+        """
+        data = {"schema_version": Settings.SCHEMA_VERSION}
+        for name in _FIELDS_NAMES:
+            value = getattr(self, name)
+            if name in _ENUM_FIELDS:
+                value = None if value is None else value.value
+            elif name in _ENUM_LIST_FIELDS:
+                value = [item.value for item in value]
+            elif name in _LIST_FIELDS:
+                value = list(value)
+            data[name] = value
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Settings":
+        """
+        The missing fields get their default values and the unknown fields are ignored.
+        """
+        schema_version = data.get("schema_version", 1)
+        if schema_version > Settings.SCHEMA_VERSION:
+            raise ValueError(f"The settings schema version {schema_version} is newer than the supported version "
+                             f"{Settings.SCHEMA_VERSION}")
+        values = {}
+        for name in _FIELDS_NAMES:
+            if name not in data:
+                continue
+            value = data[name]
+            if name in _ENUM_FIELDS:
+                value = None if value is None else _ENUM_FIELDS[name](value)
+            elif name in _ENUM_LIST_FIELDS:
+                enum_type = _ENUM_LIST_FIELDS[name]
+                value = [enum_type(item) for item in value]
+            elif name in _LIST_FIELDS:
+                value = list(value)
+            values[name] = value
+        return cls(**values)
+
+    def to_json(self, **kwargs) -> str:
+        """
+        :param kwargs: passed to json.dumps, for example indent.
+        """
+        return json.dumps(self.to_dict(), **kwargs)
+
+    @classmethod
+    def from_json(cls, text: str) -> "Settings":
+        return cls.from_dict(json.loads(text))
+
+
+_FIELDS_NAMES = tuple(settings_field.name for settings_field in fields(Settings))
+_ENUM_FIELDS = {"semester": Semester, "language": Language}
+_ENUM_LIST_FIELDS = {"show_only_classes_in_days": Day, "output_formats": OutputFormat}
+_LIST_FIELDS = {"_degrees"}
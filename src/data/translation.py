@@ -1,9 +1,12 @@
+import functools
+from typing import Dict
+
 from src.data.case_insensitive_dict import TextCaseInsensitiveDict
 from src.data.language import Language
 
 # pylint: disable=line-too-long
 
-data = TextCaseInsensitiveDict({
+_source_texts = {
     "Test": "בדיקה",
     "There are no courses in the system, please try again with another campus update your database from the server.": "אין קורסים במערכת, אנא נסה שנית עם קמפוס אחר או נסה לעדכן את בסיס נתונים מהשרת.",
     "No schedule possible were found": "לא נמצאה מערכת שעות אפשרית",
@@ -264,7 +267,14 @@ data = TextCaseInsensitiveDict({
     "Update settings": "עדכון הגדרות",
     "Please choose a current degree:": "אנא בחר את התואר הנוכחי אותו אתה לומד",
     "Registration isn't available, it's not the registration period.": "ההרשמה לא זמינה, המערכת עוד לא נפתחה."
-})
+}
+
+data = TextCaseInsensitiveDict(_source_texts)
+
+# Plain dictionaries per language, keyed by the exact texts of the dictionary.
+_compiled_tables: Dict[Language, Dict[str, str]] = {}
+# The other texts (like a different case) are normalised by the dictionary, only the recent ones are kept.
+MAX_NORMALISED_TEXTS = 1024
 
 
 def _(text: str):
@@ -272,10 +282,27 @@ def _(text: str):
 
 
 def translate(text: str):
-    func = hebrew if Language.get_current() is Language.HEBREW else english
+    language = Language.get_current()
+    table = _compiled_tables.get(language) or _compile_table(language)
+    try:
+        return table[text]
+    except KeyError:
+        return _translate_normalised(language, text)
+
+
+@functools.lru_cache(maxsize=MAX_NORMALISED_TEXTS)
+def _translate_normalised(language: Language, text: str) -> str:
+    func = hebrew if language is Language.HEBREW else english
     return func(text)
 
 
+def _compile_table(language: Language) -> Dict[str, str]:
+    func = hebrew if language is Language.HEBREW else english
+    table = {text: func(text) for text in _source_texts}
+    _compiled_tables[language] = table
+    return table
+
+
 def english(text: str):
     assert text in data, f"Text not found in dictionary: {text}"
     return text
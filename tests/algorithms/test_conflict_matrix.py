@@ -0,0 +1,63 @@
+from src.algorithms.conflict_matrix import ConflictMatrix
+from src.data.academic_activity import AcademicActivity
+from src.data.activity import Activity
+from src.data.day import Day
+from src.data.meeting import Meeting
+from src.data.type import Type
+
+
+class TestConflictMatrix:
+
+    @staticmethod
+    def _create_activities():
+        activities = []
+        academic_activity = AcademicActivity("a", Type.LECTURE, True, "a", 1, 1, "a", "1")
+        academic_activity.add_slots([Meeting(Day.SUNDAY, "10:00", "11:00"), Meeting(Day.MONDAY, "12:00", "14:00")])
+        activities.append(academic_activity)
+
+        academic_activity = AcademicActivity("a", Type.LAB, True, "a", 1, 1, "a", "2")
+        academic_activity.add_slot(Meeting(Day.SUNDAY, "10:30", "12:00"))
+        activities.append(academic_activity)
+
+        academic_activity = AcademicActivity("b", Type.LECTURE, False, "b", 2, 2, "b", "3")
+        academic_activity.add_slot(Meeting(Day.MONDAY, "13:00", "15:00"))
+        activities.append(academic_activity)
+
+        academic_activity = AcademicActivity("c", Type.LECTURE, True, "c", 3, 3, "c", "4")
+        academic_activity.add_slot(Meeting(Day.MONDAY, "14:00", "15:00"))
+        activities.append(academic_activity)
+
+        activity = Activity("d", Type.PERSONAL, True)
+        activity.add_slot(Meeting(Day.MONDAY, "13:59", "14:01"))
+        activities.append(activity)
+
+        activities.append(Activity("e", Type.PERSONAL, True))
+        return activities
+
+    def test_same_as_activity_crash(self):
+        activities = self._create_activities()
+        conflict_matrix = ConflictMatrix(activities)
+        for activity in activities:
+            for other_activity in activities:
+                expected = activity.is_crash_with_activity(other_activity)
+                assert conflict_matrix.is_crash(activity, other_activity) == expected
+
+    def test_options_conflicts(self):
+        activities = self._create_activities()
+        conflict_matrix = ConflictMatrix(activities)
+        options = [[activities[0]], [activities[1]], [activities[0], activities[1]]]
+        other_options = [[activities[2]], [activities[3]], [activities[4]], [activities[5]]]
+        conflicts = conflict_matrix.options_conflicts(options, other_options)
+        assert conflicts.shape == (3, 4)
+        assert conflicts.tolist() == [
+            [False, False, True, False],
+            [False, False, False, False],
+            [False, False, True, False],
+        ]
+        assert conflict_matrix.options_self_conflicts(options).tolist() == [False, False, True]
+
+    def test_no_meetings(self):
+        activities = [Activity("a", Type.PERSONAL, True), Activity("b", Type.PERSONAL, True)]
+        conflict_matrix = ConflictMatrix(activities)
+        assert not conflict_matrix.matrix.any()
+        assert not ConflictMatrix([]).matrix.size
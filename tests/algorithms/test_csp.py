@@ -364,3 +364,47 @@ class TestCsp:
         }
         schedules = csp.extract_schedules(activities, None, settings, activities_ids_can_enroll, courses_degrees)
         assert len(schedules) == 4
+
+    def test_activities_without_common_track(self):
+        activities_ids_groups = {
+            "1": {1},
+            "2": {2},
+            "3": {2, 3},
+            "4": {1, 3},
+        }
+        csp = CSP()
+
+        lecture_1 = AcademicActivity("a", Type.LECTURE, True, "a", 1, 1, "a", activity_id="1")
+        lecture_1.add_slot(Meeting(Day.SUNDAY, "10:00", "11:00"))
+        lecture_2 = AcademicActivity("a", Type.LECTURE, True, "a", 1, 1, "a", activity_id="2")
+        lecture_2.add_slot(Meeting(Day.MONDAY, "10:00", "11:00"))
+        practice_3 = AcademicActivity("a", Type.PRACTICE, True, "a", 2, 1, "a", activity_id="3")
+        practice_3.add_slot(Meeting(Day.TUESDAY, "10:00", "11:00"))
+        practice_4 = AcademicActivity("a", Type.PRACTICE, True, "a", 2, 1, "a", activity_id="4")
+        practice_4.add_slot(Meeting(Day.WEDNESDAY, "10:00", "11:00"))
+        activities = [lecture_1, lecture_2, practice_3, practice_4]
+
+        settings = Settings()
+        settings.show_only_classes_can_enroll = True
+        settings.show_only_courses_with_the_same_actual_number = False
+
+        # Without the tracks every lecture can be combined with every practice
+        assert len(csp.extract_schedules(activities, settings=settings)) == 4
+        for schedules in [csp.extract_schedules(activities, None, settings, activities_ids_groups),
+                          csp.extract_schedules_minimal_consists(activities, activities_ids_groups)]:
+            assert len(schedules) == 2
+            assert any(schedule.contains([lecture_1, practice_4]) for schedule in schedules)
+            assert any(schedule.contains([lecture_2, practice_3]) for schedule in schedules)
+            # Lecture 1 and practice 3 share no track, so no schedule combines them
+            assert not any(schedule.contains([lecture_1, practice_3]) for schedule in schedules)
+
+        activities_ids_groups["4"] = {4}
+        schedules = csp.extract_schedules(activities, None, settings, activities_ids_groups)
+        assert len(schedules) == 1
+        assert schedules[0].contains([lecture_2, practice_3])
+        assert not any(schedule.contains([lecture_1, practice_3]) for schedule in schedules)
+        assert not any(schedule.contains([lecture_1, practice_4]) for schedule in schedules)
+
+        activities_ids_groups["3"] = {4}
+        assert not csp.extract_schedules_minimal_consists(activities, activities_ids_groups)
+        assert csp.get_status() is Status.FAILED
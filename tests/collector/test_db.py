@@ -1,11 +1,15 @@
 import pathlib
-from sqlite3 import IntegrityError
+from sqlite3 import IntegrityError, OperationalError
 
 import pytest
 from pytest import fixture
 
 from src import utils
+from src.collector.catalogue import Catalogue
+from src.collector.catalogue_service import CatalogueService
+from src.collector.database_snapshot import DatabaseSnapshot
 from src.collector.db import Database
+from src.collector.sessions_settings import SessionsSettings
 from src.data.academic_activity import AcademicActivity
 from src.data.activity import Activity
 from src.data.course import Course
@@ -107,6 +111,39 @@ class TestDatabase:
         assert database_mock.load_degrees()
         new_database_path.unlink(missing_ok=True)
 
+    def test_update_database_swap(self, database_mock, campuses):
+        database_mock.save_degrees([Degree.COMPUTER_SCIENCE])
+        database_path = utils.get_database_path() / TestDatabase.TEST_DATABASE_FOLDER
+        invalid_database_path = database_path / "invalid_database.db"
+        invalid_database_path.write_bytes(b"not a database" * 100)
+        with pytest.raises(Exception):
+            database_mock.update_database(invalid_database_path)
+        invalid_database_path.unlink()
+        assert database_mock.load_degrees() == [Degree.COMPUTER_SCIENCE]
+        assert not list(database_path.glob("*.tmp"))
+
+        new_database_path = database_path / "new_database.db"
+        new_database = Database(TestDatabase.TEST_DATABASE_FOLDER)
+        new_database.shared_database_path = new_database_path
+        new_database.init_shared_database_tables()
+        new_database.save_degrees(list(Degree))
+        database_mock.use_catalogue()
+        assert not database_mock.load_academic_activities(campuses[1][0], Language.ENGLISH, [])
+        snapshot = DatabaseSnapshot(database_mock.shared_database_path)
+        database_mock.shared_snapshot = snapshot
+        assert database_mock.load_degrees() == [Degree.COMPUTER_SCIENCE]
+        old_signature = snapshot.signature
+        database_mock.update_database(new_database_path)
+        new_database_path.unlink()
+        # The snapshot is reloaded and the catalogue is exported for the new file before the swap
+        assert snapshot.signature != old_signature
+        assert set(database_mock.load_degrees()) == set(Degree)
+        catalogue_path = Catalogue.get_path(database_mock.catalogue_path, snapshot.signature)
+        assert Catalogue.read_signature(catalogue_path) == snapshot.signature
+        database_mock.shared_snapshot = None
+        for path in Catalogue.get_paths(database_mock.catalogue_path):
+            path.unlink()
+
     def test_load_activities_by_parent_courses_numbers(self, database_mock, campuses):
         settings = Settings()
         campus_name = campuses[1][0]
@@ -175,6 +212,7 @@ class TestDatabase:
         database_mock.save_courses([course1, course2], Language.ENGLISH)
         database_mock.save_academic_activities([activity], "A", Language.ENGLISH)
         assert database_mock.load_courses_active_numbers() == {1234}
+        database_mock.close_connections()
         database_mock.shared_database_path.unlink()
         assert not database_mock.load_courses_active_numbers()
 
@@ -197,6 +235,37 @@ class TestDatabase:
         assert set(hebrew_courses) == set(database_mock.load_courses(Language.HEBREW))
         assert set(english_courses) == set(database_mock.load_courses(Language.ENGLISH))
 
+    def test_search_courses(self, database_mock, campuses):
+        campus_name = campuses[1][0]
+        courses = [
+            Course("אלגברה לינארית א", 120201, 320, set(Semester), {Degree.COMPUTER_SCIENCE}),
+            Course("אלגוריתמים", 120202, 321, set(Semester), {Degree.COMPUTER_SCIENCE}),
+            Course("מבוא לאלגברה", 120203, 322, set(Semester), {Degree.SOFTWARE_ENGINEERING}),
+        ]
+        database_mock.save_courses(courses, Language.HEBREW)
+        activity = AcademicActivity("אלגוריתמים", Type.LECTURE, True, "lecturer", 120202, 321, "", "1.10.3", "")
+        database_mock.save_academic_activities([activity], campus_name, Language.HEBREW)
+        database_mock.index_courses_search()
+
+        degrees = {Degree.COMPUTER_SCIENCE}
+        assert set(database_mock.search_courses("אלג", None, degrees, language=Language.HEBREW)) == \
+            {"אלגברה לינארית א", "אלגוריתמים"}
+        # The names that start with the prefix are first
+        assert database_mock.search_courses("אלג", None, set(Degree), limit=2, language=Language.HEBREW)[-1] != \
+            "מבוא לאלגברה"
+        assert database_mock.search_courses("אלג", campus_name, degrees, language=Language.HEBREW) == ["אלגוריתמים"]
+        # The aliases from the courses constraints file
+        assert database_mock.search_courses("לינארית 1", None, degrees, language=Language.HEBREW) == \
+            ["אלגברה לינארית א"]
+        assert not database_mock.search_courses("אלג", None, degrees, language=Language.ENGLISH)
+        assert not database_mock.search_courses(" ", None, degrees, language=Language.HEBREW)
+        assert not database_mock.search_courses('"*) OR', None, degrees, language=Language.HEBREW)
+
+        with database_mock.connect(database_mock.shared_database_path) as (_connection, cursor):
+            cursor.execute("DROP TABLE courses_search;")
+        assert database_mock.search_courses("לינארית", None, degrees, language=Language.HEBREW) == \
+            ["אלגברה לינארית א"]
+
     def test_personal_activities(self, database_mock):
         activity = Activity("my activity")
         activity.add_slot(Meeting(Day.MONDAY, "10:00", "12:00"))
@@ -218,18 +287,226 @@ class TestDatabase:
         assert loaded == [academic_activity]
         assert loaded[0].meetings == [Meeting(Day.MONDAY, "10:00", "12:00")]
 
+    def test_load_meetings_in_batches(self, database_mock, campuses):
+        campus_name = "A"
+        database_mock.max_query_parameters = 2
+        activities = []
+        for i in range(5):
+            activity = AcademicActivity("name", Type.LECTURE, True, "meir", 12, 232, "", f"12.{i}", "", 0, 100, 1213)
+            activity.add_slots([Meeting(Day(i + 1), "10:00", "12:00"), Meeting(Day(i + 1), "13:00", "14:00")])
+            activities.append(activity)
+        database_mock.save_academic_activities(activities, campus_name, Language.ENGLISH)
+        loaded = database_mock.load_academic_activities(campus_name, Language.ENGLISH,
+                                                        [Course("name", 12, 232, set(Semester), set(Degree))])
+        assert sorted(loaded, key=lambda activity: activity.activity_id) == activities
+        assert all(len(activity.meetings) == 2 for activity in loaded)
+
+    def test_connection_pool(self, database_mock):
+        database_mock.save_degrees(list(Degree))
+        with database_mock.connect(database_mock.shared_database_path) as (connection, _cursor):
+            with database_mock.connect(database_mock.shared_database_path) as (nested_connection, _nested_cursor):
+                assert nested_connection is connection
+        with database_mock.connect(database_mock.shared_database_path) as (same_connection, cursor):
+            assert same_connection is connection
+            cursor.execute("PRAGMA temp_store;")
+            assert cursor.fetchone()[0] == 2
+        with database_mock.connect(database_mock.personal_database_path) as (_connection, cursor):
+            cursor.execute("PRAGMA journal_mode;")
+            assert cursor.fetchone()[0] == "wal"
+
+        with pytest.raises(OperationalError):
+            with database_mock.connect(database_mock.shared_database_path) as (_connection, cursor):
+                cursor.execute("DELETE FROM degrees;")
+                cursor.execute("SELECT * FROM not_exists_table;")
+        assert set(database_mock.load_degrees()) == set(Degree)
+
+        database_mock.close_connections()
+        with database_mock.connect(database_mock.shared_database_path) as (new_connection, _cursor):
+            assert new_connection is not connection
+
+    def test_bulk_write(self, database_mock):
+        with database_mock.bulk_write(database_mock.shared_database_path, synchronous_off=True) as (_conn, cursor):
+            database_mock.save_degrees(list(Degree))
+            database_mock.save_semesters(list(Semester))
+            cursor.execute("PRAGMA synchronous;")
+            assert cursor.fetchone()[0] == 0
+        assert set(database_mock.load_degrees()) == set(Degree)
+        assert set(database_mock.load_semesters()) == set(Semester)
+        with database_mock.connect(database_mock.shared_database_path) as (_connection, cursor):
+            cursor.execute("PRAGMA synchronous;")
+            assert cursor.fetchone()[0] != 0
+
+        with pytest.raises(KeyError):
+            with database_mock.bulk_write(database_mock.shared_database_path) as (_connection, cursor):
+                cursor.execute("DELETE FROM degrees;")
+                raise KeyError()
+        assert set(database_mock.load_degrees()) == set(Degree)
+
+    def test_lookup_cache(self, database_mock, campuses):
+        database_mock.save_degrees(list(Degree))
+        assert set(database_mock.load_degrees()) == set(Degree)
+        assert database_mock.load_campuses() == campuses
+        assert database_mock.load_campus_id("B") == 2
+        queries = []
+        with database_mock.connect(database_mock.shared_database_path) as (connection, _cursor):
+            connection.set_trace_callback(queries.append)
+            assert database_mock.load_campuses() == campuses
+            assert database_mock.load_campus_id("ג") == 3
+            assert set(database_mock.load_degrees()) == set(Degree)
+            connection.set_trace_callback(None)
+        assert not queries
+
+        database_mock.save_campuses({4: ("D", "ד")})
+        assert database_mock.load_campus_id("D") == 4
+        database_mock.clear_shared_database()
+        database_mock.init_shared_database_tables()
+        assert not database_mock.load_campuses()
+        assert not database_mock.load_degrees()
+
+    def test_shared_snapshot(self, database_mock):
+        database_mock.save_degrees([Degree.COMPUTER_SCIENCE])
+        database_mock.use_shared_snapshot()
+        assert database_mock.load_degrees() == [Degree.COMPUTER_SCIENCE]
+        with pytest.raises(OperationalError):
+            database_mock.save_degrees(list(Degree))
+
+        snapshot = DatabaseSnapshot(database_mock.shared_database_path, check_interval=0)
+        database_mock.shared_snapshot = None
+        database_mock.save_degrees(list(Degree))
+        database_mock.shared_snapshot = snapshot
+        with snapshot.connect() as connection:
+            assert set(database_mock.load_degrees()) == set(Degree)
+            database_mock.shared_snapshot = None
+            database_mock.clear_shared_database()
+            database_mock.shared_snapshot = snapshot
+            with snapshot.connect() as nested_connection:
+                assert nested_connection is connection
+        assert not database_mock.are_shared_tables_exists()
+
+    def test_shipped_database_schema_version(self):
+        Database().check_shared_schema_version()
+
+    def test_shared_database_migrations(self, database_mock):
+        assert database_mock.load_shared_schema_version() == len(Database.SHARED_MIGRATIONS)
+        with database_mock.connect(database_mock.shared_database_path) as (_connection, cursor):
+            cursor.execute("PRAGMA user_version = 0;")
+            cursor.execute("DROP INDEX meetings_activity_language_minutes_index;")
+        with pytest.raises(ValueError):
+            database_mock.check_shared_schema_version()
+        database_mock.migrate_shared_database()
+        database_mock.check_shared_schema_version()
+        assert database_mock.load_shared_schema_version() == len(Database.SHARED_MIGRATIONS)
+        database_mock.clear_shared_database()
+        assert database_mock.load_shared_schema_version() == 0
+        database_mock.init_shared_database_tables()
+        assert database_mock.load_shared_schema_version() == len(Database.SHARED_MIGRATIONS)
+        with database_mock.connect(database_mock.shared_database_path) as (_connection, cursor):
+            cursor.execute("EXPLAIN QUERY PLAN SELECT day, start_minutes, end_minutes FROM meetings "
+                           "WHERE activity_id = ? AND language_value = ?;", ("1", "en"))
+            assert "COVERING INDEX meetings_activity_language_minutes_index" in str(cursor.fetchall())
+        database_mock.analyze_shared_database()
+
+    def test_meetings_minutes_and_week_slots(self, database_mock, campuses):
+        activity = AcademicActivity("course", Type.LECTURE, True, "lecturer", 1, 2, "", "1.10.3", "")
+        activity.add_slot(Meeting(Day.SUNDAY, "08:00", "10:00"))
+        activity.add_slot(Meeting(Day.MONDAY, "20:00", "23:00"))
+        assert activity.get_week_slots() == 0b10 | 0b110000000 << Meeting.WEEK_SLOTS_PER_DAY
+        personal_activity = Activity.create_personal_from_database(7, "personal")
+        personal_activity.add_slot(Meeting(Day.FRIDAY, "07:15", "09:45"))
+        database_mock.save_academic_activities([activity], campuses[1][0], Language.ENGLISH)
+        database_mock.save_personal_activities([personal_activity])
+
+        expected_minutes = [(1, 480, 600), (2, 1200, 1380)]
+        with database_mock.connect(database_mock.shared_database_path) as (_connection, cursor):
+            cursor.execute("UPDATE meetings SET start_minutes = NULL, end_minutes = NULL;")
+            cursor.execute("UPDATE activities SET week_slots = NULL;")
+            cursor.execute("PRAGMA user_version = 3;")
+        with database_mock.connect(database_mock.personal_database_path) as (_connection, cursor):
+            cursor.execute("UPDATE personal_meetings SET start_minutes = NULL, end_minutes = NULL;")
+            cursor.execute("PRAGMA user_version = 0;")
+        database_mock.init_database_tables()
+        assert database_mock.load_personal_schema_version() == len(Database.PERSONAL_MIGRATIONS)
+
+        with database_mock.connect(database_mock.shared_database_path) as (_connection, cursor):
+            cursor.execute("SELECT day, start_minutes, end_minutes FROM meetings ORDER BY day;")
+            assert cursor.fetchall() == expected_minutes
+            cursor.execute("SELECT week_slots FROM activities;")
+            assert cursor.fetchall() == [(activity.get_week_slots(),)]
+            cursor.execute("SELECT DISTINCT activity_id FROM meetings "
+                           "WHERE language_value = ? AND day = ? AND start_minutes < ? AND end_minutes > ?;",
+                           ("en", Day.MONDAY.value, 22 * 60, 21 * 60))
+            assert cursor.fetchall() == [("1.10.3",)]
+        loaded_activity, = database_mock.load_academic_activities(campuses[1][0], Language.ENGLISH,
+                                                                  [Course("course", 1, 2)])
+        assert loaded_activity.meetings == activity.meetings
+        assert list(map(tuple, loaded_activity.meetings)) == list(map(tuple, activity.meetings))
+        assert database_mock.load_personal_activities()[0].meetings == personal_activity.meetings
+
+    def test_load_activities_in_time_range(self, database_mock, campuses):
+        morning_activity = AcademicActivity("course", Type.LECTURE, True, "lecturer", 1, 2, "", "1.10.1", "")
+        morning_activity.add_slot(Meeting(Day.SUNDAY, "08:00", "10:00"))
+        morning_activity.add_slot(Meeting(Day.MONDAY, "20:00", "23:00"))
+        noon_activity = AcademicActivity("course", Type.PRACTICE, True, "lecturer", 1, 2, "", "1.10.2", "")
+        noon_activity.add_slot(Meeting(Day.SUNDAY, "10:00", "12:00"))
+        database_mock.save_academic_activities([morning_activity, noon_activity], campuses[1][0], Language.ENGLISH)
+
+        def load_activities_ids(day, start_minutes, end_minutes, campus_name=campuses[1][0]):
+            activities = database_mock.load_activities_in_time_range(campus_name, Language.ENGLISH, day,
+                                                                     start_minutes, end_minutes)
+            return sorted(activity.activity_id for activity in activities)
+
+        assert load_activities_ids(Day.SUNDAY, 9 * 60, 11 * 60) == ["1.10.1", "1.10.2"]
+        assert load_activities_ids(Day.SUNDAY, 8 * 60, 10 * 60) == ["1.10.1"]
+        assert load_activities_ids(Day.SUNDAY, 10 * 60, 12 * 60) == ["1.10.2"]
+        assert load_activities_ids(Day.SUNDAY, 12 * 60, 14 * 60) == []
+        assert load_activities_ids(Day.MONDAY, 22 * 60, 23 * 60) == ["1.10.1"]
+        assert load_activities_ids(Day.TUESDAY, 0, 24 * 60) == []
+        assert load_activities_ids(Day.SUNDAY, 0, 24 * 60, campuses[2][0]) == []
+        assert not database_mock.load_activities_in_time_range(campuses[1][0], Language.HEBREW, Day.SUNDAY,
+                                                               0, 24 * 60)
+        loaded_activity, = database_mock.load_activities_in_time_range(campuses[1][0], Language.ENGLISH, Day.MONDAY,
+                                                                       20 * 60, 21 * 60)
+        assert loaded_activity.meetings == morning_activity.meetings
+        with database_mock.connect(database_mock.shared_database_path) as (_connection, cursor):
+            cursor.execute("EXPLAIN QUERY PLAN SELECT activity_id FROM meetings "
+                           "WHERE language_value = ? AND day = ? AND start_minutes < ? AND end_minutes > ?;",
+                           ("en", Day.SUNDAY.value, 11 * 60, 9 * 60))
+            assert "meetings_day_minutes_index" in str(cursor.fetchall())
+
+    def test_activities_groups_numbers(self, database_mock, campuses):
+        assert AcademicActivity.parse_group_number("120701.10.5785.01") == 10
+        assert AcademicActivity.parse_group_number("120701.01.5785.01") == 1
+        assert AcademicActivity.parse_group_number("120701.10") is None
+        assert AcademicActivity.parse_group_number("a1.10.1") is None
+        assert AcademicActivity.parse_group_number(None) is None
+
+        activities = [AcademicActivity("course", Type.LECTURE, True, "lecturer", 1, 2, "", "1.10.3", ""),
+                      AcademicActivity("course", Type.LAB, True, "lecturer", 1, 2, "", "1.02.3", ""),
+                      AcademicActivity("course", Type.LAB, True, "lecturer", 1, 2, "", "no group", "")]
+        database_mock.save_academic_activities(activities, campuses[1][0], Language.ENGLISH)
+        query = "SELECT activity_id, group_number FROM activities ORDER BY activity_id;"
+        expected_groups = [("1.02.3", 2), ("1.10.3", 10), ("no group", None)]
+        with database_mock.connect(database_mock.shared_database_path) as (_connection, cursor):
+            cursor.execute(query)
+            assert cursor.fetchall() == expected_groups
+            cursor.execute("UPDATE activities SET group_number = NULL;")
+            cursor.execute("PRAGMA user_version = 1;")
+        database_mock.migrate_shared_database()
+        with database_mock.connect(database_mock.shared_database_path) as (_connection, cursor):
+            cursor.execute(query)
+            assert cursor.fetchall() == expected_groups
+
     def test_activities_can_enroll_in(self, database_mock):
         all_activities_can_enroll_in = {
             "12.1.1": {103},
             "10.10.1": {103, 104},
+            "11.10.1": set(),
         }
         database_mock.clear_activities_ids_tracks_can_enroll()
         assert not database_mock.load_activities_ids_groups_can_enroll_in()
         database_mock.save_activities_ids_groups_can_enroll_in(all_activities_can_enroll_in)
         loaded_activities_ids = database_mock.load_activities_ids_groups_can_enroll_in()
-        assert len(loaded_activities_ids) == 2
-        assert loaded_activities_ids["12.1.1"] == {103}
-        assert loaded_activities_ids["10.10.1"] == {103, 104}
+        assert loaded_activities_ids == all_activities_can_enroll_in
 
     def test_mandatory_degrees(self, database_mock):
         course = Course("course", 10, 20, Semester.FALL,
@@ -320,6 +597,64 @@ class TestDatabase:
         database_mock.clear_settings()
         assert database_mock.load_settings() is None
 
+    def test_sessions_settings(self, database_mock):
+        settings = Settings()
+        settings.campus_name = "first"
+        database_mock.save_settings(settings, "first_session")
+        settings.campus_name = "second"
+        database_mock.save_settings(settings, "second_session")
+        assert database_mock.load_settings("first_session").campus_name == "first"
+        assert database_mock.load_settings("second_session").campus_name == "second"
+        assert database_mock.load_settings() is None
+        assert not database_mock.settings_file_path.exists()
+
+        loaded_settings = database_mock.load_settings("first_session")
+        loaded_settings.campus_name = "changed"
+        assert database_mock.load_settings("first_session").campus_name == "first"
+        database_mock.clear_settings("first_session")
+        assert database_mock.load_settings("first_session") is None
+        assert database_mock.load_settings("second_session") is not None
+
+        sessions_settings = SessionsSettings(max_sessions=2)
+        for session_id in ["a", "b", "c"]:
+            sessions_settings.set(session_id, settings)
+        assert sessions_settings.get("a") is None
+        assert sessions_settings.get("c") == settings
+
+    def test_personal_cache(self, database_mock):
+        settings = Settings()
+        settings.campus_name = "first"
+        database_mock.save_settings(settings)
+        loaded_settings = database_mock.load_settings()
+        assert loaded_settings == settings
+        loaded_settings.campus_name = "changed"
+        assert database_mock.load_settings().campus_name == "first"
+
+        # Changed by another process
+        settings.campus_name = "second campus"
+        with open(database_mock.settings_file_path, "w", encoding=utils.ENCODING) as file:
+            file.write(settings.to_json())
+        assert database_mock.load_settings().campus_name == "second campus"
+
+        database_mock.save_years({1: "a"})
+        assert database_mock.load_years() == {1: "a"}
+        with open(database_mock.years_file_path, "w", encoding=utils.ENCODING) as file:
+            file.write('{"2": "bb"}')
+        assert database_mock.load_years() == {2: "bb"}
+
+        database_mock.save_current_versions("1.0", "2.0")
+        assert database_mock.load_current_versions() == ("1.0", "2.0")
+        database_mock.clear_versions()
+        assert database_mock.load_current_versions() == (None, None)
+
+        course = Course("course1", 1234, 2, set(Semester), set(Degree))
+        database_mock.save_courses([course], Language.ENGLISH)
+        assert not database_mock.load_courses_already_done(Language.ENGLISH)
+        database_mock.save_courses_already_done({course})
+        assert database_mock.load_courses_already_done(Language.ENGLISH) == {course}
+        database_mock.clear_courses_already_done()
+        assert not database_mock.load_courses_already_done(Language.ENGLISH)
+
     def test_years(self, database_mock):
         database_mock.clear_years()
         assert not database_mock.load_years()
@@ -364,6 +699,166 @@ class TestDatabase:
         assert len(courses_choices) == 2
         assert courses_choices == excepted_courses_choices
 
+    def test_load_courses_choices_english_groups(self, database_mock, campuses):
+        campus_name = campuses[1][0]
+        activities = [
+            AcademicActivity("name1", Type.LECTURE, True, "meir", 124, 34, "", "124.01.1", "", 0, 100, 1213),
+            AcademicActivity("name1", Type.SEMINAR, True, "dan", 124, 34, "", "124.10.1", "", 0, 100, 1213),
+            AcademicActivity("name1", Type.PRACTICE, True, "meir2", 124, 34, "", "124.20.2", "", 0, 100, 1213),
+            AcademicActivity("name1", Type.LAB, True, "tal", 124, 34, "", "12a.20.2", "", 0, 100, 1213),
+            AcademicActivity("name2", Type.LECTURE, True, "dan", 125, 35, "", "125.10.1", "", 0, 100, 1213),
+        ]
+        courses = [Course("name1", 124, 34, set(Semester), set(Degree)),
+                   Course("name2", 125, 35, set(Semester), set(Degree))]
+        database_mock.save_courses(courses, Language.ENGLISH)
+        database_mock.save_academic_activities(activities, campus_name, Language.ENGLISH)
+
+        courses_choices = database_mock.load_courses_choices(campus_name, Language.ENGLISH, set(Degree), courses)
+        assert courses_choices["name1"].available_teachers_for_lecture == {"meir", "dan"}
+        assert courses_choices["name1"].available_teachers_for_practice == {"meir2", "tal"}
+        assert courses_choices["name2"].available_teachers_for_lecture == {"dan"}
+
+        settings = Settings()
+        settings.show_english_speaker_courses = False
+        courses_choices = database_mock.load_courses_choices(campus_name, Language.ENGLISH, set(Degree), courses,
+                                                             extract_unrelated_degrees=True, settings=settings)
+        assert list(courses_choices.keys()) == ["name1"]
+        assert courses_choices["name1"].parent_course_number == 34
+        assert courses_choices["name1"].available_teachers_for_lecture == {"meir"}
+        assert courses_choices["name1"].available_teachers_for_practice == {"tal"}
+
+    def test_materialized_courses_choices(self, database_mock, campuses):
+        campus_name = campuses[1][0]
+        activities = [
+            AcademicActivity("name1", Type.LECTURE, True, "meir", 124, 34, "", "124.01.1", "", 0, 100, 1213),
+            AcademicActivity("name1", Type.PRACTICE, True, "dan", 124, 34, "", "124.10.2", "", 0, 100, 1213),
+            AcademicActivity("name2", Type.LECTURE, True, "tal", 125, 35, "", "125.01.1", "", 0, 100, 1213),
+        ]
+        courses = [Course("name1", 124, 34, set(Semester), set(Degree)),
+                   Course("name2", 125, 35, set(Semester), set(Degree))]
+        degrees = Degree.get_defaults()
+        settings = Settings()
+        settings.show_english_speaker_courses = False
+        database_mock.save_courses(courses, Language.ENGLISH)
+        database_mock.save_academic_activities(activities, campus_name, Language.ENGLISH)
+        assert not database_mock.load_materialized_courses_choices(campus_name, Language.ENGLISH, settings)
+        expected_courses_choices = database_mock.load_courses_choices(campus_name, Language.ENGLISH, degrees,
+                                                                      extract_unrelated_degrees=True, settings=settings)
+        assert expected_courses_choices["name1"].available_teachers_for_practice == set()
+
+        database_mock.materialize_courses_choices()
+        courses_choices = database_mock.load_materialized_courses_choices(campus_name, Language.ENGLISH, settings)
+        assert list(courses_choices.items()) == list(expected_courses_choices.items())
+        for name, course_choice in courses_choices.items():
+            assert course_choice.__dict__ == expected_courses_choices[name].__dict__
+        all_courses_choices = database_mock.load_materialized_courses_choices(campus_name, Language.ENGLISH)
+        assert all_courses_choices["name1"].available_teachers_for_practice == {"dan"}
+        assert not database_mock.load_materialized_courses_choices(campus_name, Language.HEBREW)
+
+        database_mock.save_academic_activities(activities, campus_name, Language.HEBREW)
+        assert not database_mock.load_materialized_courses_choices(campus_name, Language.ENGLISH)
+
+    def test_catalogue(self, database_mock, campuses):
+        campus_name = campuses[1][0]
+        activity = AcademicActivity("course", Type.LECTURE, True, "lecturer", 1221, 2, "", "1.10.3", None, 5, 10, 7)
+        activity.add_slot(Meeting(Day.MONDAY, "10:00", "12:00"))
+        activity.add_slot(Meeting(Day.SUNDAY, "08:30", "09:45"))
+        activity2 = AcademicActivity("course", Type.LAB, True, "lecturer", 1221, 2, "מקום", "1.0.5", "תיאור")
+        activity2.add_slot(Meeting(Day.WEDNESDAY, "10:00", "12:00"))
+        database_mock.save_courses([Course("course", 1221, 2, set(Semester), set(Degree))], Language.ENGLISH)
+        database_mock.save_academic_activities([activity, activity2], campus_name, Language.ENGLISH)
+        courses = database_mock.load_courses(Language.ENGLISH)
+        expected_activities = database_mock.load_academic_activities(campus_name, Language.ENGLISH, courses)
+
+        database_mock.use_catalogue()
+        activities = database_mock.load_academic_activities(campus_name, Language.ENGLISH, courses)
+        assert Catalogue.get_paths(database_mock.catalogue_path)
+        assert sorted(map(tuple, activities)) == sorted(map(tuple, expected_activities))
+        assert {item: item.meetings for item in activities} == {item: item.meetings for item in expected_activities}
+        assert database_mock.load_academic_activities(campus_name, Language.ENGLISH, courses, ["1.0.5"]) == [activity2]
+        assert not database_mock.load_academic_activities(campus_name, Language.HEBREW, courses)
+        settings = Settings()
+        settings.show_english_speaker_courses = False
+        activities = database_mock.load_activities_by_parent_courses_numbers({2}, campus_name, Language.ENGLISH,
+                                                                             settings=settings)
+        assert activities == [activity2]
+
+        # The catalogue is exported again after the database is changed, to a new file
+        old_paths = Catalogue.get_paths(database_mock.catalogue_path)
+        database_mock.save_academic_activities([activity], campus_name, Language.HEBREW)
+        assert database_mock.load_academic_activities(campus_name, Language.HEBREW, courses) == [activity]
+        paths = Catalogue.get_paths(database_mock.catalogue_path)
+        assert len(paths) == 1 and paths != old_paths
+        paths[0].unlink()
+
+        # A failed export isn't retried until the database is changed
+        exports = []
+
+        def export():
+            exports.append(True)
+            raise OSError("Disk is full")
+
+        base_path = database_mock.catalogue_path.with_name("failed_catalogue.bin")
+        with pytest.raises(OSError):
+            Catalogue.open(base_path, (1, 2, 3), export)
+        assert Catalogue.open(base_path, (1, 2, 3), export) is None
+        with pytest.raises(OSError):
+            Catalogue.open(base_path, (1, 2, 4), export)
+        assert len(exports) == 2
+
+    def test_catalogue_service(self, database_mock, campuses):
+        campus_name = campuses[1][0]
+        course1 = Course("course1", 1234, 2, set(Semester), {Degree.COMPUTER_SCIENCE})
+        course2 = Course("course2", 1235, 3, set(Semester), {Degree.COMPUTER_SCIENCE})
+        database_mock.save_courses([course1, course2], Language.ENGLISH)
+        database_mock.save_academic_activities([AcademicActivity("course1", course_number=1234,
+                                                                 parent_course_number=2)],
+                                               campus_name, Language.ENGLISH)
+        catalogue = CatalogueService(database_mock, max_views=2)
+        degrees = {Degree.COMPUTER_SCIENCE}
+
+        view = catalogue.get_view(Language.ENGLISH, degrees)
+        assert set(view.courses) == {course1, course2}
+        assert view.courses_by_number[1235] == course2
+        assert catalogue.get_view(Language.ENGLISH, degrees) is view
+        # The courses are loaded once and shared
+        assert catalogue.load_courses(Language.ENGLISH, degrees)[0] is view.courses[0]
+        assert catalogue.load_courses(Language.ENGLISH, degrees, campus_name) == [course1]
+
+        catalogue.get_view(Language.HEBREW, degrees)
+        assert catalogue.get_view(Language.ENGLISH, degrees) is not view
+
+        view = catalogue.get_view(Language.ENGLISH, degrees)
+        course3 = Course("course3", 1236, 4, set(Semester), {Degree.COMPUTER_SCIENCE})
+        database_mock.save_courses([course3], Language.ENGLISH)
+        assert course3 in catalogue.get_view(Language.ENGLISH, degrees).courses
+
+        view = catalogue.get_view(Language.ENGLISH, degrees)
+        catalogue.invalidate()
+        assert catalogue.get_view(Language.ENGLISH, degrees) is not view
+
+    def test_query_profiler(self, database_mock, campuses):
+        profiler = Database.query_profiler
+        profiler.reset()
+        profiler.enable(slow_query_seconds=0)
+        try:
+            profiler.start_scope()
+            database_mock.load_campus_names(Language.ENGLISH)
+            database_mock.save_degrees([Degree.COMPUTER_SCIENCE])
+            scope_stats = profiler.end_scope()
+        finally:
+            profiler.disable()
+        assert scope_stats["load_campus_names"].queries_count == 1
+        assert scope_stats["load_campus_names"].rows_count == len(campuses)
+        assert scope_stats["save_degrees"].queries_count >= 1
+        assert scope_stats["save_degrees"].seconds > 0
+        assert profiler.get_stats()["load_campus_names"].rows_count == len(campuses)
+        assert "load_campus_names" in profiler.get_summary(scope_stats)
+
+        profiler.reset()
+        database_mock.load_campus_names(Language.ENGLISH)
+        assert not profiler.get_stats()
+
     def test_clear_all(self, database_mock):
         database_mock.clear_all_data()
         database_mock.shared_database_path.unlink(missing_ok=True)
@@ -377,6 +872,7 @@ class TestDatabase:
                 super().__init__(TestDatabase.TEST_DATABASE_FOLDER)
                 database_path = utils.get_database_path() / TestDatabase.TEST_DATABASE_FOLDER
                 self.shared_database_path = database_path / "database.db"
+                self.catalogue_path = database_path / "catalogue.bin"
                 self.user_name_file_path.unlink(missing_ok=True)
 
         database = DatabaseMock()
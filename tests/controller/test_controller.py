@@ -1,6 +1,6 @@
 import shutil
 from contextlib import suppress
-from typing import Dict, Set
+from typing import Dict, Optional, Set
 from unittest.mock import MagicMock, patch
 import pytest
 from pytest import fixture
@@ -77,14 +77,18 @@ class TestController:
                 self.logger.info("load_language was called")
                 return self.settings.language
 
-            def save_settings(self, _settings: Settings):
+            def save_settings(self, settings: Settings, session_id: Optional[str] = None):
                 self.logger.info("save_settings was called")
+                if session_id:
+                    super().save_settings(settings, session_id)
 
             def save_courses_console_choose(self, _course_choices: Dict[str, CourseChoice]):
                 self.logger.info("save_courses_console_choose was called")
 
-            def load_settings(self):
+            def load_settings(self, session_id: Optional[str] = None):
                 self.logger.info("load_settings was called")
+                if session_id:
+                    return super().load_settings(session_id)
                 return self.settings
 
         return DatabaseMock()
@@ -1,3 +1,4 @@
+import json
 import os
 import shutil
 from copy import copy
@@ -50,6 +51,14 @@ class TestData:
 
         assert [Day.MONDAY.value, "09:00", "11:00"] == [*meeting]
 
+        meeting_from_minutes = Meeting.from_minutes(Day.MONDAY.value, 9 * 60, 11 * 60)
+        assert meeting_from_minutes == meeting
+        assert tuple(meeting_from_minutes.start_time) == tuple(Meeting.str_to_time("09:00"))
+        assert Meeting.minutes_to_time(13 * 60 + 5) == Meeting.str_to_time("13:05")
+        assert meeting.get_week_slots() == 0b110 << Meeting.WEEK_SLOTS_PER_DAY
+        assert Meeting(Day.SUNDAY, "05:00", "06:00").get_week_slots() == 0b1
+        assert Meeting(Day.SUNDAY, "21:00", "23:59").get_week_slots() == 0b110000000
+
         meeting = Meeting(Day.SUNDAY, "14:30", "16:00")
         meeting1 = Meeting(Day.SUNDAY, "16:15", "17:00")
         meeting2 = Meeting(Day.SUNDAY, "17:00", "18:30")
@@ -104,12 +113,27 @@ class TestData:
 
         activity.name = "name"
         assert repr(activity) == "name"
-        assert hash(activity) == hash("name")
+        assert hash(activity) == hash(activity.key)
+        assert activity.key == ("name", Type.LAB.value, False,
+                                ((Day.MONDAY.value, 9 * 60, 11 * 60), (Day.MONDAY.value, 16 * 60, 18 * 60),
+                                 (Day.MONDAY.value, 18 * 60, 19 * 60)))
+        activity.meetings = []
+        assert activity.key[-1] == ()
+
+        # The activities are compared by their content, not by their ids
+        activity2 = Activity("name", Type.LAB, False)
+        assert activity2.activity_id != activity.activity_id
+        assert activity2 == activity
+        assert hash(activity2) == hash(activity)
+        activity2.attendance_required = True
+        assert activity2 != activity
 
     def test_academic_activity(self):
         activity = AcademicActivity("name", activity_type=Type.LAB, course_number=10, parent_course_number=20)
-        hash_attributes = (activity.name, activity.course_number, activity.parent_course_number, activity.activity_id)
-        assert hash(activity) == hash(tuple([*hash_attributes]))
+        assert hash(activity) == hash(("name", Type.LAB.value, True, (), None, None, 10, 20, None))
+        assert activity == AcademicActivity("name", activity_type=Type.LAB, course_number=10, parent_course_number=20)
+        assert activity != AcademicActivity("name", Type.LAB, course_number=10, parent_course_number=20,
+                                            activity_id="1")
         course = Course("name", 10, 20, set(Semester), set(Degree))
         assert activity.same_as_course(course)
         activities = [activity]
@@ -178,10 +202,61 @@ class TestData:
         assert schedule.get_learning_days() == {Day.SUNDAY, Day.MONDAY, Day.THURSDAY, Day.FRIDAY}
         assert schedule.get_standby_in_minutes() == standby_time_in_minutes
         assert repr(schedule) == "name"
+        metrics = schedule.metrics
+        assert schedule.metrics is metrics
+        assert schedule.metrics.first_start_by_day[Day.MONDAY] == 9 * 60
+        assert schedule.metrics.last_end_by_day[Day.MONDAY] == 20 * 60
+        assert schedule.metrics.last_end_by_day[Day.THURSDAY] == 22 * 60
+        assert schedule.get_all_meetings_by_day(Day.TUESDAY) == set()
 
         copied_schedule = copy(schedule)
         assert copied_schedule == schedule
         assert hash(copied_schedule) == hash(schedule)
+        assert schedule == Schedule("name", "file_name", "description", [activity2, activity])
+
+        # The key keeps duplicate activities and their attendance
+        assert schedule.key == tuple(sorted([activity.key, activity2.key], key=repr))
+        assert schedule != Schedule("name", "file_name", "description", [activity, activity2, activity2])
+        activity3 = Activity("name2", Type.LAB, True)
+        activity3.add_slot(meeting6)
+        assert schedule != Schedule("name", "file_name", "description", [activity, activity3])
+
+    def test_schedule_from_options(self):
+        Language.set_current(Language.ENGLISH)
+        activity = Activity("name", Type.LAB, False)
+        activity.add_slot(Meeting(Day.MONDAY, "09:00", "11:00"))
+        activity2 = Activity("name", Type.LAB, False)
+        activity2.add_slot(Meeting(Day.SUNDAY, "09:00", "11:00"))
+        activity3 = Activity("name2", Type.LECTURE, False)
+        options_table = ([[activity], [activity2]], [[activity3]])
+
+        schedule = Schedule.from_options(3, (1, 0), options_table)
+        assert schedule.name == "Option 3"
+        assert schedule.file_name == "option_3"
+        assert schedule.activities == [activity2, activity3]
+        assert schedule == Schedule("Option 3", "option_3", "", [activity2, activity3])
+
+        schedule.file_name += "_suffix"
+        assert schedule.file_name == "option_3_suffix"
+        assert copy(schedule).activities == [activity2, activity3]
+
+        # Changes to the returned activities don't change the schedule, its metrics and key
+        metrics, key = schedule.metrics, schedule.key
+        activities = schedule.activities
+        activities.remove(activity3)
+        assert schedule.activities == [activity2, activity3]
+        assert schedule.metrics is metrics
+        assert schedule.key == key
+        assert schedule == Schedule("Option 3", "option_3", "", [activity2, activity3])
+
+        # Setting the activities invalidates the metrics and the key
+        schedule.activities = activities
+        assert schedule.activities == [activity2]
+        assert schedule.metrics is not metrics
+        assert schedule.metrics.learning_days == {Day.SUNDAY}
+        assert schedule.key != key
+        assert schedule == Schedule("Option 3", "option_3", "", [activity2])
+        assert schedule != Schedule("Option 3", "option_3", "", [activity2, activity3])
 
     def test_sort_meeting(self):
         meeting = Meeting(Day.MONDAY, "09:00", "11:00")
@@ -205,6 +280,15 @@ class TestData:
         assert _("Test") == "בדיקה"
 
         assert translation.translate("Test") == translation._("Test")
+        assert _("test:") == "בדיקה"
+        assert _("test:") == "בדיקה"
+        with pytest.raises(KeyError):
+            _("Text that is not exists")
+        # Only the texts of the dictionary are kept in the table of the language
+        # pylint: disable=protected-access
+        assert "test:" not in translation._compiled_tables[Language.HEBREW]
+        assert "Text that is not exists" not in translation._compiled_tables[Language.HEBREW]
+        assert translation._translate_normalised.cache_info().maxsize == translation.MAX_NORMALISED_TEXTS
 
         assert repr(Language.ENGLISH) == "english"
         assert Language.contains("EnglISh")
@@ -312,7 +396,6 @@ class TestData:
         assert repr(Flow.CONSOLE) == "console"
 
     def test_settings(self):
-        # pylint: disable=no-member
         excepted_settings = Settings()
         excepted_settings.degrees = Degree.get_defaults()
         json_settings = Settings().to_json()
@@ -322,6 +405,34 @@ class TestData:
         settings.degree = Degree.COMPUTER_SCIENCE
         assert settings.degree == Degree.COMPUTER_SCIENCE
 
+    def test_settings_codec(self):
+        settings = Settings()
+        settings.campus_name = "בדיקה"
+        settings.semester = Semester.SUMMER
+        settings.language = Language.ENGLISH
+        settings.degrees = {Degree.COMPUTER_SCIENCE}
+        settings.show_only_classes_in_days = [Day.MONDAY, Day.FRIDAY]
+        settings.output_formats = [OutputFormat.EXCEL, OutputFormat.CSV]
+        json_settings = settings.to_json(indent=4, ensure_ascii=False)
+        assert json.loads(json_settings)["schema_version"] == Settings.SCHEMA_VERSION
+        loaded_settings = Settings.from_json(json_settings)
+        assert loaded_settings == settings
+        assert all(isinstance(day, Day) for day in loaded_settings.show_only_classes_in_days)
+        assert loaded_settings.to_json(indent=4, ensure_ascii=False) == json_settings
+
+        # Saved before the schema version, the missing fields get their default values
+        old_settings = Settings.from_json('{"campus_name": "old", "semester": 3, "output_formats": ["csv"], '
+                                          '"unknown_field": 1}')
+        assert old_settings.campus_name == "old"
+        assert old_settings.semester is Semester.SPRING
+        assert old_settings.output_formats == [OutputFormat.CSV]
+        assert old_settings.show_only_classes_in_days == list(Day)
+
+        with pytest.raises(ValueError):
+            Settings.from_json(json.dumps({"schema_version": Settings.SCHEMA_VERSION + 1}))
+        with pytest.raises(ValueError):
+            Settings.from_json('{"output_formats": ["doc"]}')
+
     def test_prerequisite_course(self):
         object_data = PrerequisiteCourse(id=1, course_number=20, name="Name", can_be_taken_in_parallel=True)
         json_data = object_data.to_json(include_can_be_taken_in_parallel=True)